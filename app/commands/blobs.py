@@ -0,0 +1,32 @@
+"""Blob store maintenance. Run `python -m app.commands.migrate` first so the blob schema exists.
+
+    python -m app.commands.blobs migrate   # move inline BYTEA content into the blob store
+    python -m app.commands.blobs gc        # delete blobs nothing references any more
+    python -m app.commands.blobs stats     # print the dedup ratio
+"""
+import argparse
+import json
+from app.config.database import SessionLocal, get_engine
+from app.services import blob_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blob store maintenance")
+    parser.add_argument("command", choices=["migrate", "gc", "stats"])
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        if args.command == "migrate":
+            print(json.dumps(blob_service.migrate_inline_content(db, args.batch_size)))
+        elif args.command == "gc":
+            print(json.dumps({"deleted": blob_service.collect_garbage(db)}))
+        print(json.dumps(blob_service.dedup_stats(db)))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Prepare a database for the API: apply migrations and seed reference data.
+
+    python -m app.commands.bootstrap
+
+Run it once per deploy, before starting the workers; workers never touch the schema.
+"""
+from sqlalchemy.dialects.postgresql import insert
+from app.config.database import get_engine
+from app.models.models import Role
+from app import migrations
+
+# Roles the audit workflow relies on (plan_audit checks them)
+DEFAULT_ROLES = [
+    {"code": "auditor", "label": "Auditor"},
+    {"code": "auditee", "label": "Auditee"},
+]
+
+
+def main():
+    engine = get_engine()
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Role).values(DEFAULT_ROLES).on_conflict_do_nothing(index_elements=[Role.code]))
+    print("Database ready")
+
+
+if __name__ == "__main__":
+    main()
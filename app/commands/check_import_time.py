@@ -0,0 +1,81 @@
+"""Import-time budget check for cold starts.
+
+    python -m app.commands.check_import_time [--budget-ms 2500] [--module app.main]
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, keeps the fastest run,
+prints the slowest imports and exits with status 1 when the cumulative import time of the
+module is over budget. It also fails if importing schemas, models or services loads a router.
+The budget can be set with IMPORT_TIME_BUDGET_MS.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Baseline: app.main took 1177-1804 ms (best of 5, eight samples) on an unchanged tree, so a
+# budget close to the typical figure fails on noise. 2500 ms is the worst sample plus ~40%.
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 2500))
+
+# Modules that must stay importable without dragging the HTTP layer in
+LAYERING_CHECK = """
+import pkgutil, importlib, sys
+import app.schemas.schema, app.models.models, app.services
+for info in pkgutil.iter_modules(app.services.__path__):
+    importlib.import_module(f"app.services.{info.name}")
+loaded = sorted(name for name in sys.modules if name.startswith("app.routers"))
+print(",".join(loaded))
+"""
+
+
+def measure(module: str):
+    """Return {module name: (self_us, cumulative_us)} for one cold import of module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when the app takes too long to import")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda timings: timings[args.module][1])
+    total_ms = best[args.module][1] / 1000
+
+    print(f"Slowest imports of {args.module} (self time):")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:8.1f} ms)  {name}")
+    print(f"{args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms, best of {args.runs})")
+
+    failed = False
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time is over budget by {total_ms - args.budget_ms:.1f} ms")
+        failed = True
+
+    layering = subprocess.run([sys.executable, "-c", LAYERING_CHECK], capture_output=True, text=True)
+    if layering.returncode != 0:
+        print(f"FAIL: importing schemas/models/services failed:\n{layering.stderr}")
+        failed = True
+    elif layering.stdout.strip():
+        print(f"FAIL: schemas/models/services import routers: {layering.stdout.strip()}")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
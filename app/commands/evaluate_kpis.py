@@ -0,0 +1,29 @@
+"""Raise corrective actions for KPI values outside their thresholds.
+
+    python -m app.commands.evaluate_kpis          # values ingested since the last pass
+    python -m app.commands.evaluate_kpis --full   # every value, e.g. after changing thresholds
+
+Meant to run right after ingest_kpis (or from cron); values that already have a corrective
+action are never given a second one.
+"""
+import argparse
+import json
+from app.config.database import SessionLocal, get_engine
+from app.services.kpi_service import KPIEvaluationService
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate KPI values against their thresholds")
+    parser.add_argument("--full", action="store_true", help="re-check every value, not only the new ones")
+    args = parser.parse_args(argv)
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        print(json.dumps(KPIEvaluationService(db).evaluate(full=args.full), indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
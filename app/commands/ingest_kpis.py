@@ -0,0 +1,33 @@
+"""Bulk load KPI values exported by the ERP.
+
+    python -m app.commands.ingest_kpis values.csv [--batch-size 5000]
+    python -m app.commands.ingest_kpis values.parquet   # needs pyarrow
+
+Columns: kpi_code, periodtype, period_start, period_end, value. Values are upserted on
+(kpi_id, periodtype, period), so loading the same file twice is harmless.
+"""
+import argparse
+import json
+from app.config.database import SessionLocal, get_engine
+from app.services import kpi_ingest_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk load KPI values from a CSV or Parquet file")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=kpi_ingest_service.INGEST_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as stream:
+            batches = kpi_ingest_service.read_kpi_batches(stream, args.path, args.batch_size)
+            report = kpi_ingest_service.ingest_kpi_values(batches, db)
+        print(json.dumps(report, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Schema migrations.
+
+    python -m app.commands.migrate            # apply pending migrations
+    python -m app.commands.migrate status     # list migrations and whether they are applied
+"""
+import argparse
+from app.config.database import get_engine
+from app import migrations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    parser.add_argument("--target", type=int, help="stop after this revision")
+    args = parser.parse_args(argv)
+    engine = get_engine()
+
+    if args.command == "status":
+        for m in migrations.status(engine):
+            print(f"{m['revision']:04d} {'applied' if m['applied'] else 'pending':8} {m['description']}")
+    else:
+        migrations.upgrade(engine, target=args.target)
+
+
+if __name__ == "__main__":
+    main()
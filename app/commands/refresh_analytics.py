@@ -0,0 +1,27 @@
+"""Refresh the materialized views served by /analytics.
+
+    python -m app.commands.refresh_analytics
+
+Run from cron (e.g. every 15 minutes); the refresh is concurrent, so the API keeps answering
+from the previous data while it runs.
+"""
+import argparse
+import json
+from app.config.database import SessionLocal, get_engine
+from app.services import analytics_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the audit analytics materialized views")
+    parser.parse_args(argv)
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        print(json.dumps(analytics_service.refresh_views(db), indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,89 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 from sqlalchemy.ext.declarative import declarative_base
+from app.config.pool_metrics import (
+    InstrumentedAsyncNullPool, InstrumentedAsyncQueuePool, InstrumentedNullPool, InstrumentedQueuePool
+)
 
 load_dotenv()
 
 
 # Retrieve DATABASE_URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL")
+# The async stack talks to the same database through asyncpg unless told otherwise
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if DATABASE_URL else None
+)
 Base = declarative_base()
 
-# SQLAlchemy setup
-engine = create_engine(DATABASE_URL, echo=False)
+# Connection pool settings. DB_POOL_MODE=null opens a connection per checkout,
+# which is what you want behind PgBouncer in transaction pooling mode.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def engine_options(use_async: bool = False):
+    if DB_POOL_MODE == "null":
+        poolclass = InstrumentedAsyncNullPool if use_async else InstrumentedNullPool
+        return {"poolclass": poolclass, "pool_pre_ping": DB_POOL_PRE_PING}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if use_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# SQLAlchemy setup. Engines are built on first use (or in the app lifespan) rather than at
+# import time; building one does not open a connection either, that happens on first checkout.
+_engine = None
+_async_engine = None
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL, echo=False, **engine_options())
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, **engine_options(use_async=True))
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+async def dispose_engines():
+    global _engine, _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
 
 
 # Dependency to get DB session
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
@@ -26,3 +91,8 @@ def get_db():
         db.close()
 
 
+# Dependency to get an async DB session, for handlers that should not hold a threadpool slot
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,116 @@
+import threading
+from time import perf_counter
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = 0
+
+    def observe(self, elapsed_ms: float):
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples += 1
+
+    def snapshot(self):
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "samples": self.samples,
+            "avg_ms": round(self.total_ms / self.samples, 3) if self.samples else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class PoolMetrics:
+    """Process-wide counters fed by the instrumented pool classes below."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait = LatencyHistogram()
+        self.checkout = LatencyHistogram()
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait.observe(seconds * 1000)
+
+    def record_checkout(self, seconds: float):
+        with self._lock:
+            self.checkout.observe(seconds * 1000)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool):
+        with self._lock:
+            data = {
+                "pool_class": type(pool).__name__,
+                "timeouts": self.timeouts,
+                "wait_time": self.wait.snapshot(),
+                "checkout_latency": self.checkout.snapshot(),
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return data
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class _InstrumentedPool:
+    metrics = pool_metrics
+
+    # _do_get covers waiting for a free slot (or opening a connection);
+    # connect() additionally covers the pre-ping and checkout handlers
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        finally:
+            self.metrics.record_wait(perf_counter() - started)
+
+    def connect(self):
+        started = perf_counter()
+        connection = super().connect()
+        self.metrics.record_checkout(perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPool, NullPool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+class InstrumentedAsyncNullPool(_InstrumentedPool, NullPool):
+    metrics = async_pool_metrics
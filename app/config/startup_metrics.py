@@ -0,0 +1,47 @@
+import logging
+from time import perf_counter
+
+
+class StartupMetrics:
+    """Cold-start timings of this worker, measured from the moment app.main started importing."""
+
+    def __init__(self):
+        self.import_started = None
+        self.import_ms = None
+        self.ready_ms = None
+        self.first_request_latency_ms = None
+        self.first_request_done_ms = None
+
+    def mark_import_started(self, started: float):
+        self.import_started = started
+
+    def mark_imported(self):
+        self.import_ms = self._since_start()
+        logging.info(f"app.main imported in {self.import_ms} ms")
+
+    def mark_ready(self):
+        self.ready_ms = self._since_start()
+        logging.info(f"Worker ready {self.ready_ms} ms after import started")
+
+    def record_request(self, latency_seconds: float):
+        if self.first_request_latency_ms is not None:
+            return
+        self.first_request_latency_ms = round(latency_seconds * 1000, 3)
+        self.first_request_done_ms = self._since_start()
+        logging.info(f"First request served in {self.first_request_latency_ms} ms")
+
+    def _since_start(self):
+        if self.import_started is None:
+            return None
+        return round((perf_counter() - self.import_started) * 1000, 3)
+
+    def snapshot(self):
+        return {
+            "import_ms": self.import_ms,
+            "ready_ms": self.ready_ms,
+            "first_request_latency_ms": self.first_request_latency_ms,
+            "first_request_done_ms": self.first_request_done_ms,
+        }
+
+
+startup_metrics = StartupMetrics()
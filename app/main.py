@@ -1,26 +1,39 @@
-from fastapi import FastAPI
-from app.config.database import Base, engine
-from app.routers.questionnaire_api import router as questionnaire_router
-from app.routers.audit_api import router as audit_router
-from app.routers.user_api import router as user_router
-from app.routers.role_api import router as role_router
-from app.routers.question_api import router as question_router
-from app.routers.entity_api import router as entity_router
-from app.routers.corrective_action_api import router as corrective_action
-from app.routers.finding_api import router as finding_router
-# Create all the tables in the database
-Base.metadata.create_all(bind=engine)
-
-app=FastAPI()
-
-app.include_router(audit_router)
-app.include_router(questionnaire_router)
-app.include_router(user_router)
-app.include_router(role_router)
-app.include_router(question_router)
-app.include_router(entity_router)
-app.include_router(corrective_action)
-app.include_router(finding_router)
+from time import perf_counter
+_import_started = perf_counter()
 
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from app.config.database import dispose_engines, get_async_engine, get_engine
+from app.config.startup_metrics import startup_metrics
+from app.routers import include_routers
+# The schema is managed by versioned migrations: python -m app.commands.bootstrap
 
+startup_metrics.mark_import_started(_import_started)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the engines without connecting; the first request that needs the database connects
+    get_engine()
+    get_async_engine()
+    startup_metrics.mark_ready()
+    yield
+    await dispose_engines()
+
+
+app=FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def record_first_request(request: Request, call_next):
+    if startup_metrics.first_request_latency_ms is not None:
+        return await call_next(request)
+    started = perf_counter()
+    response = await call_next(request)
+    startup_metrics.record_request(perf_counter() - started)
+    return response
+
+
+include_routers(app)
+
+startup_metrics.mark_imported()
@@ -0,0 +1,102 @@
+"""Versioned schema migrations, applied with `python -m app.commands.migrate`.
+
+Each module in app/migrations/versions is named vNNNN_<description>.py and defines:
+
+    revision: int          # applied in ascending order, recorded in schema_migration
+    description: str
+    transactional: bool    # False runs in autocommit, needed for CREATE INDEX CONCURRENTLY
+    def upgrade(conn): ...
+
+v0001 creates whatever tables are missing straight from the models, so on a fresh database
+it already reflects the latest schema. Every later migration must therefore be idempotent
+(ADD COLUMN IF NOT EXISTS, CREATE INDEX ... IF NOT EXISTS, ...).
+"""
+import importlib
+import pkgutil
+from sqlalchemy import text
+
+MIGRATION_TABLE = "schema_migration"
+# Arbitrary key for pg_advisory_lock so two deploys never migrate at the same time
+MIGRATION_LOCK_ID = 7201
+
+
+def load_migrations():
+    from app.migrations import versions
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+        if info.name.startswith("v")
+    ]
+    return sorted(modules, key=lambda module: module.revision)
+
+
+def _ensure_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATION_TABLE} ("
+        " revision INTEGER PRIMARY KEY,"
+        " description TEXT,"
+        " applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    ))
+
+
+def applied_revisions(conn):
+    _ensure_table(conn)
+    return set(conn.execute(text(f"SELECT revision FROM {MIGRATION_TABLE}")).scalars())
+
+
+def upgrade(engine, target: int = None, log=print):
+    """Apply every pending migration up to target (all of them by default)."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            applied = applied_revisions(lock_conn)
+            for migration in load_migrations():
+                if migration.revision in applied or (target is not None and migration.revision > target):
+                    continue
+                log(f"Applying {migration.revision:04d}: {migration.description}")
+                if migration.transactional:
+                    with engine.begin() as conn:
+                        migration.upgrade(conn)
+                        _record(conn, migration)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        migration.upgrade(conn)
+                        _record(conn, migration)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+def _record(conn, migration):
+    conn.execute(
+        text(f"INSERT INTO {MIGRATION_TABLE} (revision, description) VALUES (:revision, :description)"),
+        {"revision": migration.revision, "description": migration.description}
+    )
+
+
+def status(engine):
+    with engine.connect() as conn:
+        applied = applied_revisions(conn)
+        conn.commit()
+    return [
+        {"revision": m.revision, "description": m.description, "applied": m.revision in applied}
+        for m in load_migrations()
+    ]
+
+
+def create_index_concurrently(conn, name: str, ddl: str):
+    """Run a CREATE [UNIQUE] INDEX CONCURRENTLY IF NOT EXISTS statement.
+
+    A failed concurrent build leaves an INVALID index behind that IF NOT EXISTS would skip,
+    so such leftovers are dropped first.
+    """
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(ddl))
+
+
+def constraint_exists(conn, name: str):
+    return conn.execute(text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name}).first() is not None
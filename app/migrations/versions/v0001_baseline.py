@@ -0,0 +1,10 @@
+from app.config.database import Base
+import app.models.models  # noqa: F401  (registers the tables on Base.metadata)
+
+revision = 1
+description = "create missing tables from the models"
+transactional = True
+
+
+def upgrade(conn):
+    Base.metadata.create_all(bind=conn)
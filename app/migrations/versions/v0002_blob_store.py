@@ -0,0 +1,19 @@
+from sqlalchemy import text
+from app.models.models import BLOB_REF_COUNT_FUNCTION, BLOB_REF_COUNTED_TABLES, blob_ref_count_trigger
+
+revision = 2
+description = "blob store references, ref_count triggers and finding.created_at"
+transactional = True
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE audit_response ADD COLUMN IF NOT EXISTS content_digest VARCHAR(64) REFERENCES blob (digest)"))
+    conn.execute(text("ALTER TABLE audit_response ADD COLUMN IF NOT EXISTS content_size BIGINT"))
+    conn.execute(text("ALTER TABLE audit_response ADD COLUMN IF NOT EXISTS content_type TEXT"))
+    conn.execute(text("ALTER TABLE attachement ADD COLUMN IF NOT EXISTS content_digest VARCHAR(64) REFERENCES blob (digest)"))
+    conn.execute(text("ALTER TABLE attachement ADD COLUMN IF NOT EXISTS content_size BIGINT"))
+    conn.execute(text("ALTER TABLE finding ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ DEFAULT now()"))
+    conn.execute(BLOB_REF_COUNT_FUNCTION)
+    for table in BLOB_REF_COUNTED_TABLES:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table.name}_blob_ref_count ON {table.name}"))
+        conn.execute(blob_ref_count_trigger(table))
@@ -0,0 +1,39 @@
+from sqlalchemy import text
+from app.migrations import constraint_exists, create_index_concurrently
+
+revision = 3
+description = "indexes for the hot lookup paths, unique audit questions"
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction; tables stay writable while it builds
+transactional = False
+
+INDEXES = {
+    "ix_audit_session_audit_id": "audit_session (audit_id)",
+    "ix_audit_participant_audit_role": "audit_participant (audit_id, local_role)",
+    "ix_audit_response_audit_question_id": "audit_response (audit_question_id)",
+    "ix_finding_audit_id": "finding (audit_id)",
+    "ix_finding_audit_question_id": "finding (audit_question_id)",
+    "ix_corrective_action_status": "corrective_action (status)",
+    "ix_kpi_value_kpi_id": "kpi_value (kpi_id)",
+    "ix_kpi_value_period": "kpi_value USING gist (period)",
+    "ix_questionnaire_version_questionnaire_version_no": "questionnaire_version (questionnaire_id, version_no)",
+    "ix_question_title": "question (title)",
+}
+
+
+def upgrade(conn):
+    for name, target in INDEXES.items():
+        create_index_concurrently(conn, name, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+
+    # Build the unique index online, then attach it as the constraint (a metadata-only change).
+    # Fails if an audit already has the same question twice; those rows need merging first.
+    if not constraint_exists(conn, "uq_audit_question_audit_question"):
+        create_index_concurrently(
+            conn,
+            "uq_audit_question_audit_question",
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_audit_question_audit_question "
+            "ON audit_question (audit_id, question_id)"
+        )
+        conn.execute(text(
+            "ALTER TABLE audit_question ADD CONSTRAINT uq_audit_question_audit_question "
+            "UNIQUE USING INDEX uq_audit_question_audit_question"
+        ))
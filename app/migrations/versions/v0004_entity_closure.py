@@ -0,0 +1,28 @@
+from sqlalchemy import text
+from app.models.models import ENTITY_CLOSURE_FUNCTION, ENTITY_CLOSURE_TRIGGER, EntityClosure
+
+revision = 4
+description = "entity closure table, its maintenance trigger and backfill"
+transactional = True
+
+# Guards the backfill against parent_id cycles left in old data
+MAX_BACKFILL_DEPTH = 64
+
+
+def upgrade(conn):
+    EntityClosure.__table__.create(conn, checkfirst=True)
+    conn.execute(ENTITY_CLOSURE_FUNCTION)
+    conn.execute(text("DROP TRIGGER IF EXISTS entity_closure_maintain ON entity"))
+    conn.execute(ENTITY_CLOSURE_TRIGGER)
+    conn.execute(text(f"""
+        INSERT INTO entity_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM entity
+            UNION ALL
+            SELECT tree.ancestor_id, entity.id, tree.depth + 1
+            FROM tree JOIN entity ON entity.parent_id = tree.descendant_id
+            WHERE tree.depth < {MAX_BACKFILL_DEPTH}
+        )
+        SELECT ancestor_id, descendant_id, min(depth) FROM tree GROUP BY ancestor_id, descendant_id
+        ON CONFLICT DO NOTHING
+    """))
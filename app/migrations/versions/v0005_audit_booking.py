@@ -0,0 +1,22 @@
+from sqlalchemy import text
+from app.models.models import BTREE_GIST_EXTENSION, AuditBooking
+
+revision = 5
+description = "audit_booking table with the no-double-booking exclusion constraint"
+transactional = True
+
+
+def upgrade(conn):
+    conn.execute(BTREE_GIST_EXTENSION)
+    AuditBooking.__table__.create(conn, checkfirst=True)
+    # Book the sessions of live audits. Sessions that already double book someone are skipped
+    # instead of failing the upgrade (DO NOTHING also covers the exclusion constraint)
+    conn.execute(text("""
+        INSERT INTO audit_booking (audit_session_id, user_id, audit_id, during)
+        SELECT DISTINCT s.id, p.user_id, s.audit_id, tstzrange(s.start_time, s.end_time)
+        FROM audit_session s
+        JOIN audit_participant p ON p.audit_id = s.audit_id
+        JOIN audit a ON a.id = s.audit_id
+        WHERE a.status IS DISTINCT FROM 'cancelled' AND s.start_time < s.end_time
+        ON CONFLICT DO NOTHING
+    """))
@@ -0,0 +1,14 @@
+from app.migrations import create_index_concurrently
+from app.models.models import BTREE_GIST_EXTENSION
+
+revision = 6
+description = "GiST index on kpi_value (kpi_id, period) for time-series queries"
+transactional = False
+
+
+def upgrade(conn):
+    conn.execute(BTREE_GIST_EXTENSION)
+    create_index_concurrently(
+        conn, "ix_kpi_value_kpi_id_period",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_kpi_value_kpi_id_period ON kpi_value USING gist (kpi_id, period)"
+    )
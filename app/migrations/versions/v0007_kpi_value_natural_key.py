@@ -0,0 +1,22 @@
+from sqlalchemy import text
+from app.migrations import constraint_exists, create_index_concurrently
+
+revision = 7
+description = "unique (kpi_id, periodtype, period) on kpi_value for ingest upserts"
+transactional = False
+
+
+def upgrade(conn):
+    # Same online build as uq_audit_question_audit_question. Fails if a KPI already has two values
+    # for the same period; those rows need merging first.
+    if not constraint_exists(conn, "uq_kpi_value_kpi_periodtype_period"):
+        create_index_concurrently(
+            conn,
+            "uq_kpi_value_kpi_periodtype_period",
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_kpi_value_kpi_periodtype_period "
+            "ON kpi_value (kpi_id, periodtype, period)"
+        )
+        conn.execute(text(
+            "ALTER TABLE kpi_value ADD CONSTRAINT uq_kpi_value_kpi_periodtype_period "
+            "UNIQUE USING INDEX uq_kpi_value_kpi_periodtype_period"
+        ))
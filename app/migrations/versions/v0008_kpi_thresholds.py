@@ -0,0 +1,32 @@
+from sqlalchemy import text
+from app.models.models import (
+    KPI_VALUE_INGEST_SEQ_FUNCTION, KPI_VALUE_INGEST_SEQ_TRIGGER, KPIEvaluationWatermark
+)
+
+revision = 8
+description = "KPI thresholds, kpi_value.ingest_seq and the evaluation watermark"
+transactional = True
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "ALTER TABLE kpi_definition "
+        "ADD COLUMN IF NOT EXISTS target INTEGER, "
+        "ADD COLUMN IF NOT EXISTS threshold_min INTEGER, "
+        "ADD COLUMN IF NOT EXISTS threshold_max INTEGER"
+    ))
+    conn.execute(text("CREATE SEQUENCE IF NOT EXISTS kpi_value_ingest_seq"))
+    # The volatile default rewrites kpi_value once and numbers the existing rows, so the first
+    # evaluation pass covers the whole history
+    conn.execute(text(
+        "ALTER TABLE kpi_value ADD COLUMN IF NOT EXISTS ingest_seq BIGINT NOT NULL "
+        "DEFAULT nextval('kpi_value_ingest_seq')"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_kpi_value_ingest_seq ON kpi_value (ingest_seq)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_kpi_corrective_action_kpi_value_id ON kpi_corrective_action (kpi_value_id)"
+    ))
+    conn.execute(KPI_VALUE_INGEST_SEQ_FUNCTION)
+    conn.execute(text("DROP TRIGGER IF EXISTS kpi_value_bump_ingest_seq ON kpi_value"))
+    conn.execute(KPI_VALUE_INGEST_SEQ_TRIGGER)
+    KPIEvaluationWatermark.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,10 @@
+from app.models.analytics import create_views
+
+revision = 9
+description = "materialized views for audit analytics"
+transactional = True
+
+
+def upgrade(conn):
+    # Built WITH DATA: a concurrent refresh is refused on a view that was never populated
+    create_views(conn)
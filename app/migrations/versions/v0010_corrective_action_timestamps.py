@@ -0,0 +1,33 @@
+from sqlalchemy import text
+from app.migrations import create_index_concurrently
+
+revision = 10
+description = "created_at/updated_at on corrective_action and the open backlog index"
+transactional = False
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "ALTER TABLE corrective_action "
+        "ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ, "
+        "ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ"
+    ))
+    # Existing actions were created with their finding; that is the best age we have for them
+    conn.execute(text("""
+        UPDATE corrective_action ca
+        SET created_at = coalesce(f.created_at, now())
+        FROM finding f
+        WHERE f.id = ca.finding_id AND ca.created_at IS NULL
+    """))
+    conn.execute(text("UPDATE corrective_action SET created_at = now() WHERE created_at IS NULL"))
+    conn.execute(text("UPDATE corrective_action SET updated_at = created_at WHERE updated_at IS NULL"))
+    conn.execute(text(
+        "ALTER TABLE corrective_action "
+        "ALTER COLUMN created_at SET DEFAULT now(), ALTER COLUMN created_at SET NOT NULL, "
+        "ALTER COLUMN updated_at SET DEFAULT now(), ALTER COLUMN updated_at SET NOT NULL"
+    ))
+    create_index_concurrently(
+        conn, "ix_corrective_action_open_created_at",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_corrective_action_open_created_at "
+        "ON corrective_action (created_at) WHERE status IS DISTINCT FROM 'completed'"
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import text
+from app.migrations import constraint_exists
+
+revision = 11
+description = "foreign key from audit_response.content_digest to blob where it is missing"
+transactional = True
+
+
+def upgrade(conn):
+    # Databases upgraded through the startup DDL got content_digest before the blob table
+    # existed, so v0002's ADD COLUMN IF NOT EXISTS ... REFERENCES skipped the foreign key.
+    # Uploads stored in that window have their file but no blob row; register them first,
+    # counting their references as the ref_count triggers would have.
+    if not constraint_exists(conn, "audit_response_content_digest_fkey"):
+        conn.execute(text("""
+            INSERT INTO blob (digest, size, ref_count)
+            SELECT content_digest, coalesce(max(content_size), 0), count(*)
+            FROM audit_response
+            WHERE content_digest IS NOT NULL
+            GROUP BY content_digest
+            ON CONFLICT (digest) DO NOTHING
+        """))
+        conn.execute(text(
+            "ALTER TABLE audit_response ADD CONSTRAINT audit_response_content_digest_fkey "
+            "FOREIGN KEY (content_digest) REFERENCES blob (digest)"
+        ))
@@ -0,0 +1,11 @@
+from sqlalchemy import text
+
+revision = 12
+description = "blob.registered_at for the garbage collection grace period"
+transactional = True
+
+
+def upgrade(conn):
+    # Existing blobs count as registered now, so the first collection after the upgrade keeps them
+    # for one grace period
+    conn.execute(text("ALTER TABLE blob ADD COLUMN IF NOT EXISTS registered_at TIMESTAMPTZ NOT NULL DEFAULT now()"))
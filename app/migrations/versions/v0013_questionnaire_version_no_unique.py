@@ -0,0 +1,24 @@
+from sqlalchemy import text
+from app.migrations import constraint_exists, create_index_concurrently
+
+revision = 13
+description = "unique (questionnaire_id, version_no) on questionnaire_version"
+transactional = False
+
+
+def upgrade(conn):
+    # Fails if a questionnaire already has two versions with the same number (concurrent clones
+    # before this constraint); renumber those first
+    if not constraint_exists(conn, "uq_questionnaire_version_questionnaire_version_no"):
+        create_index_concurrently(
+            conn,
+            "uq_questionnaire_version_questionnaire_version_no",
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_questionnaire_version_questionnaire_version_no "
+            "ON questionnaire_version (questionnaire_id, version_no)"
+        )
+        conn.execute(text(
+            "ALTER TABLE questionnaire_version ADD CONSTRAINT uq_questionnaire_version_questionnaire_version_no "
+            "UNIQUE USING INDEX uq_questionnaire_version_questionnaire_version_no"
+        ))
+    # The unique index serves the same lookups as the plain one from v0003
+    conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_questionnaire_version_questionnaire_version_no"))
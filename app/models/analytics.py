@@ -0,0 +1,83 @@
+"""Materialized views behind the /analytics endpoints.
+
+They are pre-aggregated per (entity, questionnaire, status) and per (auditor, status), so a read
+sums a few rows per key however long the audit history gets. The views are created by
+migration 0009 and kept current with `python -m app.commands.refresh_analytics`, which uses
+REFRESH ... CONCURRENTLY (hence the unique index on each view) so readers are never blocked.
+
+The Table objects live on their own MetaData: create_all must not try to create them as tables.
+"""
+from sqlalchemy import Column, Integer, BigInteger, Text, Enum, MetaData, Table, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.models import AuditStatus, ScoreType
+
+analytics_metadata = MetaData()
+
+# Findings are counted once per audit before joining, so they are not multiplied by any other join
+_FINDINGS_PER_AUDIT = "SELECT audit_id, count(*) AS findings FROM finding GROUP BY audit_id"
+
+audit_stats = Table(
+    "analytics_audit_stats", analytics_metadata,
+    Column("entity_id", Integer),
+    Column("questionnaire_id", Integer),
+    Column("status", Enum(AuditStatus)),
+    Column("audits", BigInteger),
+    Column("scored", BigInteger),
+    Column("findings", BigInteger),
+)
+
+auditor_stats = Table(
+    "analytics_auditor_stats", analytics_metadata,
+    Column("user_id", UUID(as_uuid=True)),
+    Column("status", Enum(AuditStatus)),
+    Column("audits", BigInteger),
+    Column("scored", BigInteger),
+    Column("findings", BigInteger),
+)
+
+score_distribution = Table(
+    "analytics_score_distribution", analytics_metadata,
+    Column("entity_id", Integer),
+    Column("questionnaire_id", Integer),
+    Column("final_score_type", Enum(ScoreType)),
+    Column("final_score", Text),
+    Column("audits", BigInteger),
+)
+
+# name -> (defining query, columns of the unique index REFRESH ... CONCURRENTLY needs)
+VIEW_DEFINITIONS = {
+    audit_stats.name: (f"""
+        SELECT a.entity_id, qv.questionnaire_id, a.status,
+               count(*) AS audits,
+               count(a.final_score) AS scored,
+               coalesce(sum(f.findings), 0)::bigint AS findings
+        FROM audit a
+        LEFT JOIN questionnaire_version qv ON qv.id = a.questionnaire_version_id
+        LEFT JOIN ({_FINDINGS_PER_AUDIT}) f ON f.audit_id = a.id
+        GROUP BY a.entity_id, qv.questionnaire_id, a.status
+    """, "entity_id, questionnaire_id, status"),
+    auditor_stats.name: (f"""
+        SELECT p.user_id, a.status,
+               count(*) AS audits,
+               count(a.final_score) AS scored,
+               coalesce(sum(f.findings), 0)::bigint AS findings
+        FROM audit_participant p
+        JOIN audit a ON a.id = p.audit_id
+        LEFT JOIN ({_FINDINGS_PER_AUDIT}) f ON f.audit_id = a.id
+        WHERE p.local_role = 'auditor'
+        GROUP BY p.user_id, a.status
+    """, "user_id, status"),
+    score_distribution.name: ("""
+        SELECT a.entity_id, qv.questionnaire_id, a.final_score_type, a.final_score, count(*) AS audits
+        FROM audit a
+        LEFT JOIN questionnaire_version qv ON qv.id = a.questionnaire_version_id
+        WHERE a.final_score IS NOT NULL
+        GROUP BY a.entity_id, qv.questionnaire_id, a.final_score_type, a.final_score
+    """, "entity_id, questionnaire_id, final_score_type, final_score"),
+}
+
+
+def create_views(conn):
+    for name, (query, key) in VIEW_DEFINITIONS.items():
+        conn.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}"))
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{name} ON {name} ({key})"))
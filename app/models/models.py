@@ -1,8 +1,10 @@
 from sqlalchemy import (
-    Column, Integer, String, Boolean, Text, ForeignKey, Sequence, Enum, CheckConstraint, TIMESTAMP
+    Column, Integer, BigInteger, String, Boolean, Text, ForeignKey, Sequence, Enum, CheckConstraint, TIMESTAMP,
+    Index, UniqueConstraint
 )
-from sqlalchemy.dialects.postgresql import UUID, BYTEA, TSRANGE
+from sqlalchemy.dialects.postgresql import UUID, BYTEA, TSRANGE, TSTZRANGE, ExcludeConstraint
 from sqlalchemy.orm import relationship, backref
+from sqlalchemy import DDL, event, func, text
 import uuid
 from app.config.database import Base 
 
@@ -95,6 +97,19 @@ class Entity(Base):
     parent_id = Column(Integer, ForeignKey('entity.id', ondelete='SET NULL'))
     parent = relationship('Entity', remote_side=[id], backref=backref('children', lazy='dynamic'))
 
+class EntityClosure(Base):
+    """One row per (ancestor, descendant) pair of the entity tree, self pairs included at depth 0.
+
+    Maintained by the entity_closure_maintain() trigger on entity.
+    """
+    __tablename__ = "entity_closure"
+    ancestor_id = Column(Integer, ForeignKey('entity.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey('entity.id', ondelete='CASCADE'), primary_key=True)
+    depth = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index("ix_entity_closure_descendant_id", "descendant_id", "depth"),
+    )
+
 class Questionnaire(Base):
     __tablename__ = "questionnaire"
     id = Column(Integer, Sequence('questionnaire_id_seq'), primary_key=True)
@@ -109,6 +124,9 @@ class QuestionnaireVersion(Base):
     questionnaire_id = Column(Integer, ForeignKey('questionnaire.id', ondelete='CASCADE'))
     version_no = Column(Integer)
     status = Column(Text)
+    __table_args__ = (
+        UniqueConstraint('questionnaire_id', 'version_no', name='uq_questionnaire_version_questionnaire_version_no'),
+    )
 
     questionnaire = relationship("Questionnaire", back_populates="versions")
     questions = relationship("Question", secondary="questionnaire_version_question", back_populates="versions")
@@ -119,6 +137,9 @@ class Question(Base):
      title = Column(Text) 
      response_type = Column(Enum(ResponseType)) 
      criticality = Column(Enum(CriticalityLevel), nullable=False)
+     __table_args__ = (
+         Index('ix_question_title', 'title'),
+     )
      versions = relationship("QuestionnaireVersion", secondary="questionnaire_version_question", back_populates="questions")
 
 class QuestionnaireVersionQuestion(Base):
@@ -142,31 +163,72 @@ class Audit(Base):
         ),
     )
 
+    entity = relationship("Entity")
+    questionnaire_version = relationship("QuestionnaireVersion")
+    sessions = relationship("AuditSession", back_populates="audit", order_by="AuditSession.start_time")
+    participants = relationship("AuditParticipant", back_populates="audit")
+
 class AuditSession(Base):
     __tablename__ = "audit_session"
     id = Column(Integer, primary_key=True)
     audit_id = Column(Integer, ForeignKey('audit.id'))
     start_time = Column(TIMESTAMP(timezone=True))
     end_time = Column(TIMESTAMP(timezone=True))
+    __table_args__ = (
+        Index('ix_audit_session_audit_id', 'audit_id'),
+    )
+
+    audit = relationship("Audit", back_populates="sessions")
+
+class AuditBooking(Base):
+    """A participant's hold on the time of one audit session.
+
+    The exclusion constraint makes double booking a user impossible, whatever path wrote the rows.
+    """
+    __tablename__ = "audit_booking"
+    audit_session_id = Column(Integer, ForeignKey('audit_session.id', ondelete='CASCADE'), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    audit_id = Column(Integer, ForeignKey('audit.id', ondelete='CASCADE'), nullable=False)
+    during = Column(TSTZRANGE, nullable=False)
+    __table_args__ = (
+        ExcludeConstraint((user_id, '='), (during, '&&'), name='ex_audit_booking_user_during', using='gist'),
+        Index('ix_audit_booking_audit_id', 'audit_id'),
+    )
 
 class AuditParticipant(Base):
     __tablename__ = "audit_participant"
     audit_id = Column(Integer, ForeignKey('audit.id', ondelete='CASCADE'), primary_key=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey('user.id'), primary_key=True)
     local_role = Column(Text, ForeignKey('role.code'), primary_key=True)
+    __table_args__ = (
+        Index('ix_audit_participant_audit_role', 'audit_id', 'local_role'),
+    )
+
+    audit = relationship("Audit", back_populates="participants")
+    user = relationship("User")
 
 class AuditQuestion(Base):
     __tablename__ = "audit_question"
     id = Column(Integer, primary_key=True)
     audit_id = Column(Integer, ForeignKey('audit.id'))
     question_id = Column(Integer, ForeignKey('question.id'))
+    __table_args__ = (
+        UniqueConstraint('audit_id', 'question_id', name='uq_audit_question_audit_question'),
+    )
 
 class AuditResponse(Base):
     __tablename__ = "audit_response"
     id = Column(Integer, primary_key=True)
     audit_question_id = Column(Integer, ForeignKey('audit_question.id', ondelete='CASCADE'))
     author_id = Column(UUID(as_uuid=True), ForeignKey('user.id', ondelete='SET NULL'))
+    # Legacy inline content; new responses live in the blob store and keep only its reference
     value = Column(BYTEA)
+    content_digest = Column(String(64), ForeignKey('blob.digest'))
+    content_size = Column(BigInteger)
+    content_type = Column(Text)
+    __table_args__ = (
+        Index('ix_audit_response_audit_question_id', 'audit_question_id'),
+    )
 
 class Finding(Base):
     __tablename__ = "finding"
@@ -174,6 +236,11 @@ class Finding(Base):
     audit_id = Column(Integer, ForeignKey('audit.id', ondelete='CASCADE'))
     audit_question_id = Column(Integer, ForeignKey('audit_question.id', ondelete='SET NULL'))
     type = Column(Text)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    __table_args__ = (
+        Index('ix_finding_audit_id', 'audit_id'),
+        Index('ix_finding_audit_question_id', 'audit_question_id'),
+    )
     corrective_action = relationship(
         "CorrectiveAction",
         back_populates="finding",
@@ -187,6 +254,16 @@ class CorrectiveAction(Base):
     finding_id = Column(Integer, ForeignKey('finding.id'), unique=True)
     title = Column(Text)
     status = Column(Enum(CorrectiveActionStatus))
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    __table_args__ = (
+        Index('ix_corrective_action_status', 'status'),
+        # Oldest open actions of the backlog dashboard
+        Index(
+            'ix_corrective_action_open_created_at', 'created_at',
+            postgresql_where=text("status IS DISTINCT FROM 'completed'")
+        ),
+    )
     finding = relationship("Finding", back_populates="corrective_action")
 
 # KPI: Definitions, Targets, Values, Process Actions
@@ -196,6 +273,14 @@ class KPIDefinition(Base):
     code = Column(Text, unique=True)
     label = Column(Text)
     type = Column(Enum(KPIType))
+    target = Column(Integer)
+    # A value outside [threshold_min, threshold_max] raises a corrective action; either bound may be unset
+    threshold_min = Column(Integer)
+    threshold_max = Column(Integer)
+
+# Stamps every insert and every change of a value, so the threshold evaluation can pick up
+# where it stopped (see kpi_value_bump_ingest_seq and KPIEvaluationWatermark)
+KPI_VALUE_INGEST_SEQ = Sequence('kpi_value_ingest_seq', metadata=Base.metadata)
 
 class KPIValue(Base):
     __tablename__ = "kpi_value"
@@ -204,12 +289,32 @@ class KPIValue(Base):
     periodtype = Column(Enum(PeriodType))
     period = Column(TSRANGE)
     value = Column(Integer)
+    ingest_seq = Column(BigInteger, server_default=KPI_VALUE_INGEST_SEQ.next_value(), nullable=False)
+    __table_args__ = (
+        Index('ix_kpi_value_kpi_id', 'kpi_id'),
+        Index('ix_kpi_value_ingest_seq', 'ingest_seq'),
+        Index('ix_kpi_value_period', 'period', postgresql_using='gist'),
+        # Per-KPI range lookups of the time-series queries (btree_gist)
+        Index('ix_kpi_value_kpi_id_period', 'kpi_id', 'period', postgresql_using='gist'),
+        # Natural key of a reported value; bulk ingest upserts on it
+        UniqueConstraint('kpi_id', 'periodtype', 'period', name='uq_kpi_value_kpi_periodtype_period'),
+    )
 
 class KPICorrectiveAction(Base):
     __tablename__ = "kpi_corrective_action"
     id = Column(Integer, primary_key=True)
     kpi_value_id = Column(Integer, ForeignKey('kpi_value.id'))
     title = Column(Text)
+    __table_args__ = (
+        Index('ix_kpi_corrective_action_kpi_value_id', 'kpi_value_id'),
+    )
+
+# Highest kpi_value.ingest_seq already run through an evaluation pass, one row per pass name
+class KPIEvaluationWatermark(Base):
+    __tablename__ = "kpi_evaluation_watermark"
+    name = Column(Text, primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, server_default="0")
+    evaluated_at = Column(TIMESTAMP(timezone=True))
 
 # Attachments
 class Attachment(Base):
@@ -217,4 +322,120 @@ class Attachment(Base):
     id = Column(Integer, primary_key=True)
     filename = Column(Text)
     path = Column(Text)
+    # Legacy inline content; new attachments reference the blob store
     object = Column(BYTEA)
+    content_digest = Column(String(64), ForeignKey('blob.digest'))
+    content_size = Column(BigInteger)
+
+
+# Stored content, deduplicated by SHA-256. ref_count is maintained by triggers on the
+# tables that reference a blob, so ORM deletes and ON DELETE CASCADE are both counted.
+class Blob(Base):
+    __tablename__ = "blob"
+    digest = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    # Last time content was stored under this digest; garbage collection waits a grace period after it
+    registered_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+BLOB_REF_COUNT_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION blob_ref_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.content_digest IS NOT NULL THEN
+        UPDATE blob SET ref_count = ref_count - 1 WHERE digest = OLD.content_digest;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.content_digest IS NOT NULL THEN
+        UPDATE blob SET ref_count = ref_count + 1 WHERE digest = NEW.content_digest;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+BLOB_REF_COUNTED_TABLES = (AuditResponse.__table__, Attachment.__table__)
+
+
+def blob_ref_count_trigger(table):
+    return DDL(
+        f"CREATE TRIGGER {table.name}_blob_ref_count "
+        f"AFTER INSERT OR DELETE OR UPDATE OF content_digest ON {table.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION blob_ref_count()"
+    )
+
+
+for _table in BLOB_REF_COUNTED_TABLES:
+    event.listen(_table, "after_create", BLOB_REF_COUNT_FUNCTION.execute_if(dialect="postgresql"))
+    event.listen(_table, "after_create", blob_ref_count_trigger(_table).execute_if(dialect="postgresql"))
+
+
+ENTITY_CLOSURE_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION entity_closure_maintain() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO entity_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, NEW.id, depth + 1 FROM entity_closure WHERE descendant_id = NEW.parent_id
+        UNION ALL
+        SELECT NEW.id, NEW.id, 0;
+        RETURN NULL;
+    END IF;
+    IF NEW.parent_id IS NOT DISTINCT FROM OLD.parent_id THEN
+        RETURN NULL;
+    END IF;
+    IF EXISTS (SELECT 1 FROM entity_closure WHERE ancestor_id = NEW.id AND descendant_id = NEW.parent_id) THEN
+        RAISE EXCEPTION 'entity %% cannot be moved under its own descendant %%', NEW.id, NEW.parent_id;
+    END IF;
+    -- Detach the moved subtree from every former ancestor
+    DELETE FROM entity_closure c
+    USING entity_closure sub, entity_closure anc
+    WHERE sub.ancestor_id = NEW.id AND c.descendant_id = sub.descendant_id
+      AND anc.descendant_id = NEW.id AND anc.ancestor_id <> NEW.id AND c.ancestor_id = anc.ancestor_id;
+    -- Attach it below the new parent and the parent's ancestors
+    INSERT INTO entity_closure (ancestor_id, descendant_id, depth)
+    SELECT p.ancestor_id, sub.descendant_id, p.depth + sub.depth + 1
+    FROM entity_closure p JOIN entity_closure sub ON sub.ancestor_id = NEW.id
+    WHERE p.descendant_id = NEW.parent_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+ENTITY_CLOSURE_TRIGGER = DDL(
+    "CREATE TRIGGER entity_closure_maintain "
+    "AFTER INSERT OR UPDATE OF parent_id ON entity "
+    "FOR EACH ROW EXECUTE FUNCTION entity_closure_maintain()"
+)
+
+event.listen(EntityClosure.__table__, "after_create", ENTITY_CLOSURE_FUNCTION.execute_if(dialect="postgresql"))
+event.listen(EntityClosure.__table__, "after_create", ENTITY_CLOSURE_TRIGGER.execute_if(dialect="postgresql"))
+
+
+# GiST has no operator class for uuid equality without btree_gist
+BTREE_GIST_EXTENSION = DDL("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+for _table in (AuditBooking.__table__, KPIValue.__table__):
+    event.listen(_table, "before_create", BTREE_GIST_EXTENSION.execute_if(dialect="postgresql"))
+
+
+# ingest_seq is taken on insert by the column default; updates that change the reading
+# (ORM edits, ingest upserts) take a new one so the value is evaluated again
+KPI_VALUE_INGEST_SEQ_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION kpi_value_bump_ingest_seq() RETURNS trigger AS $$
+BEGIN
+    IF (NEW.kpi_id, NEW.periodtype, NEW.period, NEW.value)
+       IS DISTINCT FROM (OLD.kpi_id, OLD.periodtype, OLD.period, OLD.value) THEN
+        NEW.ingest_seq := nextval('kpi_value_ingest_seq');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+KPI_VALUE_INGEST_SEQ_TRIGGER = DDL(
+    "CREATE TRIGGER kpi_value_bump_ingest_seq "
+    "BEFORE UPDATE ON kpi_value "
+    "FOR EACH ROW EXECUTE FUNCTION kpi_value_bump_ingest_seq()"
+)
+
+event.listen(KPIValue.__table__, "after_create", KPI_VALUE_INGEST_SEQ_FUNCTION.execute_if(dialect="postgresql"))
+event.listen(KPIValue.__table__, "after_create", KPI_VALUE_INGEST_SEQ_TRIGGER.execute_if(dialect="postgresql"))
@@ -0,0 +1,24 @@
+import importlib
+
+# Router modules mounted by app.main, in registration order. They are imported only when the
+# application is assembled, so schemas, models and services never pull routers in.
+ROUTER_MODULES = [
+    "app.routers.audit_api",
+    "app.routers.questionnaire_api",
+    "app.routers.user_api",
+    "app.routers.role_api",
+    "app.routers.question_api",
+    "app.routers.entity_api",
+    "app.routers.corrective_action_api",
+    "app.routers.finding_api",
+    "app.routers.kpi_api",
+    "app.routers.blob_api",
+    "app.routers.scheduling_api",
+    "app.routers.analytics_api",
+    "app.routers.internal_api",
+]
+
+
+def include_routers(app):
+    for module_name in ROUTER_MODULES:
+        app.include_router(importlib.import_module(module_name).router)
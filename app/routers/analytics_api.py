@@ -0,0 +1,53 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.config.database import get_db
+from app.schemas.schema import AuditorStats, EntityAuditStats, Page, QuestionnaireAuditStats, ScoreBucket
+from app.services import analytics_service
+from app.utils.pagination import PageParams
+
+# Read-only; figures are as of the last `python -m app.commands.refresh_analytics`
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+# Audit counts by status, findings per audit and cancellation/postponement rates per entity
+@router.get("/entities", response_model=Page[EntityAuditStats])
+def entity_stats(
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    return analytics_service.stats_by_entity(page, db, entity_id=entity_id, include_descendants=include_descendants)
+
+
+# Same figures per questionnaire, optionally limited to an entity (subtree)
+@router.get("/questionnaires", response_model=Page[QuestionnaireAuditStats])
+def questionnaire_stats(
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    return analytics_service.stats_by_questionnaire(
+        page, db, entity_id=entity_id, include_descendants=include_descendants
+    )
+
+
+# Same figures per user holding the auditor role on the audits
+@router.get("/auditors", response_model=Page[AuditorStats])
+def auditor_stats(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return analytics_service.stats_by_auditor(page, db)
+
+
+# Number of audits per final score
+@router.get("/scores", response_model=List[ScoreBucket])
+def score_distribution(
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    questionnaire_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    return analytics_service.get_score_distribution(
+        db, entity_id=entity_id, include_descendants=include_descendants, questionnaire_id=questionnaire_id
+    )
@@ -1,18 +1,24 @@
 from fastapi import APIRouter,Depends,HTTPException
 from sqlalchemy.orm import Session
-from app.config.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db, get_async_db
 from app.models.models import (
-    Entity,QuestionnaireVersion,Questionnaire,AuditSession,User,UserRole,Audit,AuditParticipant,
-    AuditQuestion,AuditResponse,Finding,CorrectiveAction,Attachment,AuditQuestion,Question)
+    AuditSession,User,Audit,AuditParticipant,
+    AuditQuestion,AuditResponse,Attachment,AuditQuestion,Question)
 
   
 import logging
-from datetime import timezone, timedelta,datetime
+from datetime import timezone
 from sqlalchemy.orm import Session
 from app.utils.utility import validate_final_score
-import os
-from fastapi import UploadFile, File
-from app.schemas.schema import RescheduleRequest,AuditRequest
+from app.utils import blob_store
+from fastapi import UploadFile, File, Body
+from typing import List, Optional
+from app.schemas.schema import RescheduleRequest,AuditRequest,AuditListItem,Page,ConflictPolicy
+from app.models.models import AuditStatus
+from app.utils.pagination import PageParams
+from app.services import audit_service, blob_service, reference_cache, report_service, role_resolver, scheduling_service
+from app.services.role_resolver import require_role
 
 
 router = APIRouter(prefix="/audit")
@@ -25,23 +31,18 @@ logging.basicConfig(
 )
 
 
-@router.post("/plan")
+@router.post("/plan", dependencies=[Depends(require_role("auditor"))])
 def plan_audit(auditR: AuditRequest, db: Session = Depends(get_db)):
-    # 1. Retrieve the entity
-    entity = db.query(Entity).filter_by(code=auditR.entity_code).first()
-    if not entity:
+    # 1. Retrieve the entity (cached reference data)
+    entity_id = reference_cache.get_entity_id(auditR.entity_code, db)
+    if not entity_id:
         raise HTTPException(status_code=404, detail=f"Entity '{auditR.entity_code}' not found")
 
     # 2. Retrieve the questionnaire and latest version
-    questionnaire = db.query(Questionnaire).filter_by(code=auditR.questionnaire_code).first()
+    questionnaire = reference_cache.get_latest_version(auditR.questionnaire_code, db)
     if not questionnaire:
         raise HTTPException(status_code=404, detail=f"Questionnaire '{auditR.questionnaire_code}' not found")
-
-    questionnaire_version = db.query(QuestionnaireVersion)\
-        .filter_by(questionnaire_id=questionnaire.id)\
-        .order_by(QuestionnaireVersion.version_no.desc())\
-        .first()
-    if not questionnaire_version:
+    if not questionnaire["version_id"]:
         raise HTTPException(status_code=404, detail=f"No version found for questionnaire '{auditR.questionnaire_code}'")
 
     # 3. Retrieve users
@@ -50,18 +51,25 @@ def plan_audit(auditR: AuditRequest, db: Session = Depends(get_db)):
     if not auditor or not auditee:
         raise HTTPException(status_code=404, detail="Auditor or Auditee not found")
 
-    # 4. Validate roles
-    auditor_role = db.query(UserRole).filter_by(user_id=auditor.id, role_code='auditor').first()
-    auditee_role = db.query(UserRole).filter_by(user_id=auditee.id, role_code='auditee').first()
-    if not auditor_role:
+    # 4. Validate roles (role sets are cached per user)
+    if not role_resolver.has_role(auditor.id, 'auditor', db):
         raise HTTPException(status_code=403, detail=f"User '{auditR.auditor_email}' does not have 'auditor' role")
-    if not auditee_role:
+    if not role_resolver.has_role(auditee.id, 'auditee', db):
         raise HTTPException(status_code=403, detail=f"User '{auditR.auditee_email}' does not have 'auditee' role")
+    if auditR.end_time <= auditR.start_time:
+        raise HTTPException(status_code=400, detail="Invalid session duration: end_time must be after start_time")
+
+    # 5. Check both calendars; reject or move to the next free slot
+    start_time, end_time = scheduling_service.resolve_conflicts(
+        [auditor.id, auditee.id],
+        scheduling_service.as_utc(auditR.start_time), scheduling_service.as_utc(auditR.end_time),
+        auditR.on_conflict == ConflictPolicy.shift, db
+    )
 
-    # 5. Create the Audit
+    # 6. Create the Audit
     audit = Audit(
-        entity_id=entity.id,
-        questionnaire_version_id=questionnaire_version.id,
+        entity_id=entity_id,
+        questionnaire_version_id=questionnaire["version_id"],
         status='planned',
         final_score_type='scale',
         final_score=None
@@ -69,30 +77,44 @@ def plan_audit(auditR: AuditRequest, db: Session = Depends(get_db)):
     db.add(audit)
     db.flush()
 
-    # 6. Create AuditSession(s)
-    duration = auditR.end_time - auditR.start_time
-    max_duration = timedelta(hours=2)
-
-    if duration <= max_duration:
-        db.add(AuditSession(audit_id=audit.id, start_time=auditR.start_time, end_time=auditR.end_time))
-    else:
-        current_start = auditR.start_time
-        while current_start < auditR.end_time:
-            current_end = min(current_start + max_duration, auditR.end_time)
-            db.add(AuditSession(audit_id=audit.id, start_time=current_start, end_time=current_end))
-            current_start = current_end
+    # 7. Create AuditSession(s)
+    for start, end in audit_service.split_into_sessions(start_time, end_time):
+        db.add(AuditSession(audit_id=audit.id, start_time=start, end_time=end))
 
-    # 7. Assign participants
+    # 8. Assign participants and book their time
     db.add(AuditParticipant(audit_id=audit.id, user_id=auditor.id, local_role='auditor'))
     db.add(AuditParticipant(audit_id=audit.id, user_id=auditee.id, local_role='auditee'))
+    scheduling_service.book_audits([audit.id], db)
 
-    # 8. Create AuditLog entry (optional)
+    # 9. Instantiate the questions of the questionnaire version
+    audit_service.materialize_audit_questions([audit.id], db)
+
+    # 10. Create AuditLog entry (optional)
     # db.add(AuditLog(audit_id=audit.id, action='planned', timestamp=datetime.utcnow()))
 
     db.commit()
-    return {"message": "Audit planned successfully", "audit_id": audit.id}
+    return {
+        "message": "Audit planned successfully",
+        "audit_id": audit.id,
+        "start_time": start_time,
+        "end_time": end_time,
+    }
+
+@router.post("/plan/bulk", dependencies=[Depends(require_role("auditor"))])
+def plan_audits_bulk(requests: List[AuditRequest], db: Session = Depends(get_db)):
+    return audit_service.plan_audits_bulk(requests, db)
 
-@router.put("/reschedule")
+@router.get("/list", response_model=Page[AuditListItem])
+def list_audits(
+    status: Optional[AuditStatus] = None,
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    return audit_service.list_audits(page, db, status=status, entity_id=entity_id, include_descendants=include_descendants)
+
+@router.put("/reschedule", dependencies=[Depends(require_role("auditor"))])
 def reschedule(request: RescheduleRequest, db: Session = Depends(get_db)):
     audit = db.query(Audit).filter_by(id=request.audit_id).first()
     if not audit:
@@ -111,15 +133,15 @@ def reschedule(request: RescheduleRequest, db: Session = Depends(get_db)):
         if duration.total_seconds() <= 0:
             raise HTTPException(status_code=400, detail="Invalid session duration: end_time must be after start_time")
 
-        max_duration = timedelta(hours=2)
-        current_start = start_time
-        session_plan = []
+        # Check the participants' calendars, ignoring this audit's own bookings
+        participant_ids = [p.user_id for p in db.query(AuditParticipant).filter_by(audit_id=audit.id)]
+        start_time, end_time = scheduling_service.resolve_conflicts(
+            participant_ids, start_time, end_time, request.on_conflict == ConflictPolicy.shift, db,
+            exclude_audit_id=audit.id
+        )
 
         # Build the new session plan
-        while current_start < end_time:
-            current_end = min(current_start + max_duration, end_time)
-            session_plan.append((current_start, current_end))
-            current_start = current_end
+        session_plan = audit_service.split_into_sessions(start_time, end_time)
 
         # Update existing sessions or create new ones
         for i, (new_start, new_end) in enumerate(session_plan):
@@ -141,6 +163,10 @@ def reschedule(request: RescheduleRequest, db: Session = Depends(get_db)):
             db.delete(leftover)
             logging.info(f"Audit {audit.id} leftover session {leftover.id} deleted")
 
+        # Re-book the participants on the new sessions
+        scheduling_service.release_audit(audit.id, db)
+        scheduling_service.book_audits([audit.id], db)
+
     # Update audit status
     audit.status = 'postponed'
     logging.info(f"Audit {audit.id} status updated to 'postponed' due to: {request.reason}")
@@ -151,20 +177,22 @@ def reschedule(request: RescheduleRequest, db: Session = Depends(get_db)):
 
 #QUESTION here does we need to delete related records like sessions and participants
 #FOR now we will not delete them because we need to see analytics about who cancel an audit always etc..
-@router.put("/cancel/{audit_id}")
+@router.put("/cancel/{audit_id}", dependencies=[Depends(require_role("auditor"))])
 def cancel_audit(audit_id: int, db: Session = Depends(get_db)):
     audit = db.query(Audit).filter_by(id=audit_id).first()
     if not audit:
         raise HTTPException(status_code=404, detail="Audit not found")
 
-    audit.status = "cancled"  
+    audit.status = AuditStatus.cancelled
+    # A cancelled audit no longer holds its participants' time
+    scheduling_service.release_audit(audit.id, db)
     logging.info(f"Audit {audit.id} status updated to 'cancelled' due to supplier not ready")
 
     db.commit()
     return {"message": "Audit cancelled successfully", "audit_id": audit.id}
 
 #NOT CLEAR but implemented related to specification
-@router.put("/start/{audit_id}")
+@router.put("/start/{audit_id}", dependencies=[Depends(require_role("auditor"))])
 def start_audit(audit_id:int,db:Session=Depends(get_db)):
     audit = db.query(Audit).filter_by(id=audit_id).first()
     if not audit:
@@ -176,7 +204,7 @@ def start_audit(audit_id:int,db:Session=Depends(get_db)):
     db.commit()
     return {"message": "Audit started successfully", "audit_id": audit.id}
 
-@router.post("/record_answer")
+@router.post("/record_answer", dependencies=[Depends(require_role("auditor"))])
 def record_answer(
     audit_id: int,
     question_id: int,
@@ -201,14 +229,16 @@ def record_answer(
     
 
     auditee=db.query(AuditParticipant).filter_by(audit_id=audit.id,local_role="auditee").first()
-    # Read file content
-    file_bytes = file.file.read()
+    # Stream the upload into the blob store in fixed-size chunks
+    digest, size = blob_service.store_upload(file.file, db)
 
     # Create response
     new_audit_response = AuditResponse(
         audit_question_id=auditQ.id,
         author_id=auditee.user_id,  #
-        value=file_bytes
+        content_digest=digest,
+        content_size=size,
+        content_type=file.content_type
     )
     db.add(new_audit_response)
     db.commit()
@@ -217,66 +247,26 @@ def record_answer(
     return {
         "message": "Response recorded successfully",
         "response_id": new_audit_response.id,
-        "filename": file.filename
+        "filename": file.filename,
+        "digest": digest,
+        "size": size
     }
 
 
 
 @router.get("/get/{audit_id}")
-def get_audit(audit_id: int, db: Session = Depends(get_db)):
-    audit = db.query(Audit).filter_by(id=audit_id).first()
-    if not audit:
-        raise HTTPException(status_code=404, detail="Audit not found")
-    # Entity info
-    entity = db.query(Entity).filter_by(id=audit.entity_id).first()
-
-    # Questionnaire info
-    qv = db.query(QuestionnaireVersion).filter_by(id=audit.questionnaire_version_id).first()
-    questionnaire = db.query(Questionnaire).filter_by(id=qv.questionnaire_id).first() if qv else None
-
-    # Sessions
-    sessions = db.query(AuditSession).filter_by(audit_id=audit.id).order_by(AuditSession.start_time).all()
-    session_data = [
-        {"start_time": s.start_time, "end_time": s.end_time}
-        for s in sessions
-    ]
-
-    # Participants
-    participants = db.query(AuditParticipant).filter_by(audit_id=audit.id).all()
-    participant_data = []
-    for p in participants:
-        user = db.query(User).filter_by(id=p.user_id).first()
-        participant_data.append({
-            "email": user.email if user else None,
-            "role": p.local_role
-        })
-
-    return {
-        "audit_id": audit.id,
-        "status": audit.status,
-        "entity": {
-            "type": entity.type if entity else None,
-            "code": entity.code if entity else None,
-            "label": entity.label if entity else None
-        },
-        "questionnaire": {
-            "code": questionnaire.code if questionnaire else None,
-            "version": qv.version_no if qv else None
-        },
-        "sessions": session_data,
-        "participants": participant_data
-    }
+async def get_audit(audit_id: int, db: AsyncSession = Depends(get_async_db)):
+    audit = await audit_service.get_audit_detail_async(audit_id, db)
+    return audit_service.serialize_audit_detail(audit)
 
 
 #TO Be reviewed if we dont need to create a file using the api and only updating here status, or we just instruct
 #the gpt via instructions when auditor close it it generates a report with finding and ca from the extchanged conversation
 #NOTE we have to update the status of audit to add opened/closed status
-@router.post("/close/")
+@router.post("/close/", dependencies=[Depends(require_role("auditor"))])
 def close_audit(audit_id: int, final_score: str,score_type, db: Session = Depends(get_db)):
-    # 1. Retrieve audit
-    audit = db.query(Audit).filter_by(id=audit_id).first()
-    if not audit:
-        raise HTTPException(status_code=404, detail="Audit not found")
+    # 1. Retrieve audit (participants and their users are loaded with it)
+    audit = audit_service.get_audit_detail(audit_id, db)
 
     # 2. Update audit status and final score
     validate_final_score(final_score, score_type)
@@ -288,62 +278,20 @@ def close_audit(audit_id: int, final_score: str,score_type, db: Session = Depend
     audit.final_score = final_score
     logging.info(f"Audit {audit.id} status updated to 'closed' with score {final_score}")
 
-    # 3. Gather related data
-    questions = db.query(AuditQuestion).filter_by(audit_id=audit.id).all()
-    responses = db.query(AuditResponse).filter(AuditResponse.audit_question_id.in_([q.id for q in questions])).all()
-    findings = db.query(Finding).filter_by(audit_id=audit.id).all()
-    corrective_actions = db.query(CorrectiveAction).filter(CorrectiveAction.finding_id.in_([f.id for f in findings])).all()
-    participants = db.query(AuditParticipant).filter_by(audit_id=audit.id).all()
-
-    # 4. Build report content (as text or binary)
-    report_lines = [
-        f"Audit ID: {audit.id}",
-        f"Status: {audit.status}",
-        f"Final Score: {audit.final_score}",
-    ]
-    
-    report_lines.append("Questions and Responses:")
-    for q in questions:
-        q_responses = [r for r in responses if r.audit_question_id == q.id]
-        for r in q_responses:
-            report_lines.append(f"  - Q{q.id}: {r.value}")
-
-    report_lines.append("Findings and Corrective Actions:")
-    for f in findings:
-        report_lines.append(f"  - Finding {f.id} ({f.type})")
-        related_actions = [ca for ca in corrective_actions if ca.finding_id == f.id]
-        for ca in related_actions:
-            report_lines.append(f"    - Action: {ca.title} [{ca.status}]")
-
-    report_lines.append("Participants:")
-    for p in participants:
-        user = db.query(User).filter_by(id=p.user_id).first()
-        report_lines.append(f"  - {user.email} as {p.local_role}")
-
-    report_text = "\n".join(report_lines)
-    report_bytes = report_text.encode("utf-8")
-    folder_path = "reports"
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-    # Create a dynamic file name based on the current date/time
-    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    report_filename = f"report_{current_datetime}-{audit.id}.txt"
-    report_file_path = os.path.join(folder_path, report_filename)
-
-    # Save the encoded bytes to a file under the 'reports' folder
-    with open(report_file_path, "wb") as file:
-        file.write(report_bytes)
-
-    print(f"Report saved as '{report_file_path}'")
-    # 5. Create attachment record
+    # 3. Stream the report into the blob store straight from the database cursors
+    report_filename, digest, size = report_service.write_audit_report(audit, db)
+    logging.info(f"Report {report_filename} stored as blob {digest}")
+
+    # 4. Create attachment record (identical reports share one stored blob)
     attachment = Attachment(
-    filename=report_filename,                     
-    path=report_file_path,                         
-    object=report_bytes                            
-        )
+        filename=report_filename,
+        path=blob_store.blob_path(digest),
+        content_digest=digest,
+        content_size=size
+    )
     db.add(attachment)
 
-    # 6. Final commit
+    # 5. Final commit
     db.commit()
 
     return {
@@ -355,7 +303,7 @@ def close_audit(audit_id: int, final_score: str,score_type, db: Session = Depend
 
 
 
-@router.post("/question")
+@router.post("/question", dependencies=[Depends(require_role("auditor"))])
 def add_audit_question(audit_id:int,question_id,db:Session=Depends(get_db)):
     
     audit = db.query(Audit).filter_by(id=audit_id).first()
@@ -366,16 +314,26 @@ def add_audit_question(audit_id:int,question_id,db:Session=Depends(get_db)):
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    audit_question=AuditQuestion(audit_id=audit_id,
-                                 question_id=question_id)
-    db.add(audit_question)
+    audit_service.add_audit_question(audit.id, question.id, db)
     db.commit()
-    db.refresh(audit_question)
     return {
         "message": f"audit question  added successfully to {audit.id}",
         "audit_question": question.title,
     }
 
+@router.post("/{audit_id}/questions/materialize", dependencies=[Depends(require_role("auditor"))])
+def materialize_audit_questions(
+    audit_id: int,
+    question_ids: Optional[List[int]] = Body(None, embed=True),
+    db: Session = Depends(get_db)
+):
+    audit = db.query(Audit).filter_by(id=audit_id).first()
+    if not audit:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    created = audit_service.materialize_audit_questions([audit.id], db, question_ids=question_ids)
+    db.commit()
+    return {"message": f"{created} audit questions added to {audit.id}", "created": created}
+
 # @router.post("/record_answer")
 #value in  this case must be TEXT but we defined as bytea (file) so we could handle this case
 # def record_answer(audit_id:int,audit_question_id:int,db:Session=Depends(get_db)):
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.config.database import get_db
+from app.models.models import Attachment, AuditResponse
+from app.services import blob_service
+from app.utils import blob_store
+
+router = APIRouter(prefix="/blob", tags=["Blobs"])
+
+
+@router.get("/stats")
+def get_blob_stats(db: Session = Depends(get_db)):
+    return blob_service.dedup_stats(db)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _blob_response(digest: str, filename: Optional[str], media_type: Optional[str], if_none_match: Optional[str]):
+    # Content is addressed by digest, so the digest is a strong validator
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    path = blob_store.blob_path(digest)
+    if not blob_store.exists(digest):
+        raise HTTPException(status_code=410, detail="Stored content is missing")
+    # FileResponse streams from disk (zero-copy when the server supports it) and answers Range requests
+    return FileResponse(
+        path,
+        media_type=media_type or "application/octet-stream",
+        filename=filename,
+        headers=headers
+    )
+
+
+def _inline_response(content: bytes, filename: Optional[str], media_type: Optional[str]):
+    # Rows not yet moved by `python -m app.commands.blobs migrate` are served from the column
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return Response(content=content, media_type=media_type or "application/octet-stream", headers=headers)
+
+
+@router.get("/attachment/{attachment_id}")
+def download_attachment(
+    attachment_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    attachment = db.query(Attachment).filter_by(id=attachment_id).first()
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    if attachment.content_digest:
+        return _blob_response(attachment.content_digest, attachment.filename, None, if_none_match)
+    if attachment.object is not None:
+        return _inline_response(attachment.object, attachment.filename, None)
+    raise HTTPException(status_code=404, detail="Attachment has no content")
+
+
+@router.get("/response/{response_id}")
+def download_response(
+    response_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    audit_response = db.query(AuditResponse).filter_by(id=response_id).first()
+    if not audit_response:
+        raise HTTPException(status_code=404, detail="Audit response not found")
+    if audit_response.content_digest:
+        return _blob_response(audit_response.content_digest, None, audit_response.content_type, if_none_match)
+    if audit_response.value is not None:
+        return _inline_response(audit_response.value, None, audit_response.content_type)
+    raise HTTPException(status_code=404, detail="Audit response has no content")
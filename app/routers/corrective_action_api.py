@@ -1,20 +1,16 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from app.config.database import get_db
-from app.services import *
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db, get_async_db
+from app.services import corrective_action_service
 from pydantic import BaseModel
-from enum import Enum
 from typing import Optional
+from app.schemas.schema import CorrectiveActionBacklog, CorrectiveActionStatus, Page
+from app.utils.pagination import PageParams
+from app.services.role_resolver import require_role
 
 router = APIRouter(prefix="/corrective_action")
 
-class CorrectiveActionStatus(str, Enum):
-    opened = "opened"
-    in_progress = "in_progress"
-    closed = "closed"
-    completed = "completed"
-    postponed = "postponed"
-
 class CorrectiveActionUpdate(BaseModel):
     title: Optional[str]
     status: Optional[CorrectiveActionStatus]
@@ -28,22 +24,43 @@ class CorrectiveActionOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+# Dashboard counts and oldest open actions; declared before /{action_id} so "backlog" is not taken for an id
+@router.get("/backlog", response_model=CorrectiveActionBacklog)
+def get_backlog(
+    top: int = Query(10, ge=1, le=100, description="Oldest open actions and busiest audits to list"),
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    db: Session = Depends(get_db)
+):
+    return corrective_action_service.get_backlog(
+        db, top=top, entity_id=entity_id, include_descendants=include_descendants
+    )
+
 @router.get("/{action_id}", response_model=CorrectiveActionOut)
 def get_action(action_id: int, db: Session = Depends(get_db)):
-    return get_corrective_action(action_id, db)
+    return corrective_action_service.get_corrective_action(action_id, db)
 
-@router.get("/", response_model=list[CorrectiveActionOut])
-def list_actions(db: Session = Depends(get_db)):
-    return list_corrective_actions(db)
+@router.get("/", response_model=Page[CorrectiveActionOut])
+async def list_actions(
+    status: Optional[CorrectiveActionStatus] = None,
+    finding_id: Optional[int] = None,
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await corrective_action_service.list_corrective_actions(
+        page, db, status=status, finding_id=finding_id, entity_id=entity_id, include_descendants=include_descendants
+    )
 
-@router.get("/status/{status}", response_model=list[CorrectiveActionOut])
-def list_by_status(status: str, db: Session = Depends(get_db)):
-    return get_actions_by_status(status, db)
+@router.get("/status/{status}", response_model=Page[CorrectiveActionOut])
+def list_by_status(status: str, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return corrective_action_service.get_actions_by_status(status, page, db)
 
-@router.put("/{action_id}", response_model=CorrectiveActionOut)
+@router.put("/{action_id}", response_model=CorrectiveActionOut, dependencies=[Depends(require_role("auditor"))])
 def update_action(action_id: int, update: CorrectiveActionUpdate, db: Session = Depends(get_db)):
-    return update_corrective_action(action_id, update.model_dump(exclude_unset=True), db)
+    return corrective_action_service.update_corrective_action(action_id, update.model_dump(exclude_unset=True), db)
 
-@router.delete("/{action_id}")
+@router.delete("/{action_id}", dependencies=[Depends(require_role("auditor"))])
 def delete_action(action_id: int, db: Session = Depends(get_db)):
-    return delete_corrective_action(action_id, db)
+    return corrective_action_service.delete_corrective_action(action_id, db)
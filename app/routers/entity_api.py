@@ -1,21 +1,44 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.config.database import get_db
 from app.services import entity_service
-from app.schemas.schema import EntityCreate, EntityUpdate, EntityResponse
+from app.schemas.schema import EntityCreate, EntityUpdate, EntityResponse, EntityTreeNode, Page
+from app.models.models import EntityType
+from app.utils.pagination import PageParams
+from app.services.role_resolver import ADMIN_ROLE, require_role
 
 router = APIRouter(prefix="/entity", tags=["Entities"])
 
 
-@router.post("/add", response_model=EntityResponse)
+@router.post("/add", response_model=EntityResponse, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def create_entity(entity: EntityCreate, db: Session = Depends(get_db)):
     return entity_service.create_entity(entity, db)
 
 
-@router.get("/getAll", response_model=List[EntityResponse])
-def get_entities(db: Session = Depends(get_db)):
-    return entity_service.get_all_entities(db)
+@router.get("/getAll", response_model=Page[EntityResponse])
+def get_entities(
+    type: Optional[EntityType] = None,
+    parent_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    return entity_service.get_all_entities(page, db, type=type, parent_id=parent_id)
+
+
+@router.get("/{entity_code}/descendants", response_model=Page[EntityTreeNode])
+def get_descendants(
+    entity_code: str,
+    max_depth: Optional[int] = Query(None, ge=1),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    return entity_service.get_descendants(entity_code, page, db, max_depth=max_depth)
+
+
+@router.get("/{entity_code}/ancestors", response_model=List[EntityTreeNode])
+def get_ancestors(entity_code: str, db: Session = Depends(get_db)):
+    return entity_service.get_ancestors(entity_code, db)
 
 
 @router.get("/{entity_code}", response_model=EntityResponse)
@@ -23,11 +46,11 @@ def get_entity(entity_code: str, db: Session = Depends(get_db)):
     return entity_service.get_entity_by_code(entity_code, db)
 
 
-@router.put("/{entity_code}", response_model=EntityResponse)
+@router.put("/{entity_code}", response_model=EntityResponse, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def update_entity(entity_code: str, entity_data: EntityUpdate, db: Session = Depends(get_db)):
     return entity_service.update_entity(entity_code, entity_data, db)
 
 
-@router.delete("/{entity_id}")
+@router.delete("/{entity_id}", dependencies=[Depends(require_role(ADMIN_ROLE))])
 def delete_entity(entity_id: int, db: Session = Depends(get_db)):
     return entity_service.delete_entity(entity_id, db)
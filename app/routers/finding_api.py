@@ -1,38 +1,78 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from datetime import datetime
 from sqlalchemy.orm import Session
-from typing import List
-from app.config.database import get_db
-from app.schemas.schema import FindingOut, FindingUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db, get_async_db
+from typing import Optional
+from app.schemas.schema import FindingOut, FindingUpdate, Page, ExportFormat
+from app.models.models import CorrectiveActionStatus
+from app.utils.pagination import PageParams
 from app.services import finding_service
+from app.services.role_resolver import require_role
 
 router = APIRouter(prefix="/finding", tags=["Findings"])
 
 
-@router.post("/finding")
+@router.post("/finding", dependencies=[Depends(require_role("auditor"))])
 def add_finding(audit_id: int, audit_question_id: int, type: str, description: str, db: Session = Depends(get_db)):
     return finding_service.add_finding(audit_id, audit_question_id, type, description, db)
 
 
-@router.get("/", response_model=List[FindingOut])
-def get_findings_by_question(audit_question_id: int, db: Session = Depends(get_db)):
-    return finding_service.get_findings_by_question(audit_question_id, db)
+@router.get("/", response_model=Page[FindingOut])
+def get_findings_by_question(audit_question_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return finding_service.get_findings_by_question(audit_question_id, page, db)
 
 
-@router.get("/by_audit", response_model=List[FindingOut])
-def get_findings_by_audit(audit_id: int, db: Session = Depends(get_db)):
-    return finding_service.get_findings_by_audit(audit_id, db)
+@router.get("/by_audit", response_model=Page[FindingOut])
+def get_findings_by_audit(audit_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return finding_service.get_findings_by_audit(audit_id, page, db)
 
 
-@router.get("/all", response_model=List[FindingOut])
-def list_all_findings(db: Session = Depends(get_db)):
-    return finding_service.list_all_findings(db)
+@router.get("/all", response_model=Page[FindingOut])
+async def list_all_findings(
+    audit_id: Optional[int] = None,
+    type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await finding_service.list_all_findings(
+        page, db, audit_id=audit_id, type=type, entity_id=entity_id, include_descendants=include_descendants
+    )
 
 
-@router.put("/update/{finding_id}", response_model=FindingOut)
+@router.get("/export")
+def export_findings(
+    format: ExportFormat = ExportFormat.ndjson,
+    audit_id: Optional[int] = None,
+    entity_id: Optional[int] = None,
+    include_descendants: bool = False,
+    # The stored enum, so an unknown status is a 422 before the stream starts, not a broken 200
+    status: Optional[CorrectiveActionStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    media_type = "text/csv" if format == ExportFormat.csv else "application/x-ndjson"
+    rows = finding_service.export_findings(
+        format.value, db,
+        audit_id=audit_id, entity_id=entity_id, status=status, date_from=date_from, date_to=date_to,
+        include_descendants=include_descendants
+    )
+    return StreamingResponse(
+        rows,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="findings.{format.value}"'}
+    )
+
+
+@router.put("/update/{finding_id}", response_model=FindingOut, dependencies=[Depends(require_role("auditor"))])
 def update_finding(finding_id: int, update: FindingUpdate, db: Session = Depends(get_db)):
     return finding_service.update_finding(finding_id, update, db)
 
 
-@router.delete("/{finding_id}")
+@router.delete("/{finding_id}", dependencies=[Depends(require_role("auditor"))])
 def delete_finding(finding_id: int, db: Session = Depends(get_db)):
     return finding_service.delete_finding(finding_id, db)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from app.config.database import get_async_engine, get_engine
+from app.config.pool_metrics import async_pool_metrics, pool_metrics
+from app.config.startup_metrics import startup_metrics
+from app.services import reference_cache
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    return {
+        "sync": pool_metrics.snapshot(get_engine().pool),
+        "async": async_pool_metrics.snapshot(get_async_engine().pool),
+    }
+
+
+@router.get("/startup")
+def get_startup_metrics():
+    return startup_metrics.snapshot()
+
+
+@router.get("/cache")
+def get_cache_metrics():
+    return reference_cache.stats()
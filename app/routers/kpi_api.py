@@ -1,26 +1,137 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.dialects.postgresql import Range
 from sqlalchemy.orm import Session
 from app.config.database import get_db
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from services import KPIDefinitionService, KPIValueService, KPICorrectiveActionService
+from typing import List, Optional
+from app.models.models import PeriodType
+from app.services.kpi_service import (
+    KPIDefinitionService, KPIValueService, KPICorrectiveActionService, KPIEvaluationService, KPISeriesService,
+    to_naive_utc
+)
+from app.services import kpi_ingest_service
+from app.schemas.schema import (
+    KPIAggregate, KPIDefinitionOut, KPIEvaluationReport, KPISeriesResponse, KPIThresholds, KPIValueOut, Page
+)
+from app.utils.pagination import PageParams
+from app.services.role_resolver import ADMIN_ROLE, require_role
 
 router = APIRouter(prefix="/kpis", tags=["KPI Definitions"])
 
 # Get KPI by code
-@router.get("/definition/{code}")
+@router.get("/definition/{code}", response_model=KPIDefinitionOut)
 def get_kpi_definition(code: str, db: Session = Depends(get_db)):
-    return KPIDefinitionService(db).get(code)
+    kpi = KPIDefinitionService(db).get(code)
+    if not kpi:
+        raise HTTPException(status_code=404, detail="KPI definition not found")
+    return kpi
 
 # List all KPI Definitions
-@router.get("/definition")
-def list_kpis(db: Session = Depends(get_db)):
-    return KPIDefinitionService(db).list()
-
-# Create KPI Value
-@router.post("/value")
-def create_kpi_value(kpi_id: int, periodtype: str, period: str, value: int, db: Session = Depends(get_db)):
-    return KPIValueService(db).create(kpi_id, periodtype, period, value)
+@router.get("/definition", response_model=Page[KPIDefinitionOut])
+def list_kpis(type: Optional[str] = None, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return KPIDefinitionService(db).list(page, type=type)
+
+# Set the target and thresholds of a KPI; unset fields are cleared
+@router.put("/definition/{code}/thresholds", response_model=KPIDefinitionOut, dependencies=[Depends(require_role(ADMIN_ROLE))])
+def set_kpi_thresholds(code: str, thresholds: KPIThresholds, db: Session = Depends(get_db)):
+    # 1. Check the bounds
+    if (thresholds.threshold_min is not None and thresholds.threshold_max is not None
+            and thresholds.threshold_min > thresholds.threshold_max):
+        raise HTTPException(status_code=400, detail="threshold_min must not exceed threshold_max")
+
+    # 2. Resolve the KPI
+    definitions = KPIDefinitionService(db)
+    kpi = definitions.get(code)
+    if not kpi:
+        raise HTTPException(status_code=404, detail="KPI definition not found")
+
+    # 3. Update (drops the cached definition); values already evaluated are only re-checked by a full pass
+    return definitions.update(kpi["id"], **thresholds.model_dump())
+
+# Raise corrective actions for the values ingested since the last pass that breach their thresholds
+@router.post("/evaluate", response_model=KPIEvaluationReport, dependencies=[Depends(require_role(ADMIN_ROLE))])
+def evaluate_kpis(
+    full: bool = Query(False, description="Re-check every value instead of only the new ones"),
+    db: Session = Depends(get_db)
+):
+    return KPIEvaluationService(db).evaluate(full=full)
+
+def _kpi_ids(codes: List[str], db: Session):
+    definitions = KPIDefinitionService(db)
+    found = {code: definitions.get(code) for code in codes}
+    missing = sorted(code for code, kpi in found.items() if not kpi)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"KPI definitions not found: {missing}")
+    return {kpi["id"]: code for code, kpi in found.items()}
+
+# Create KPI Value; the period is [period_start, period_end)
+@router.post("/value", response_model=KPIValueOut, dependencies=[Depends(require_role(ADMIN_ROLE))])
+def create_kpi_value(
+    kpi_id: int,
+    periodtype: PeriodType,
+    period_start: datetime,
+    period_end: datetime,
+    value: int,
+    db: Session = Depends(get_db)
+):
+    if period_end <= period_start:
+        raise HTTPException(status_code=400, detail="period_end must be after period_start")
+    # ON CONFLICT only covers duplicates: an unknown KPI would fail the foreign key
+    if not KPIDefinitionService(db).lock(kpi_id):
+        raise HTTPException(status_code=404, detail="KPI definition not found")
+    kpi_value = KPIValueService(db).create(
+        kpi_id, periodtype, Range(to_naive_utc(period_start), to_naive_utc(period_end), bounds="[)"), value
+    )
+    if kpi_value is None:
+        raise HTTPException(status_code=409, detail="A value already exists for this KPI, period type and period")
+    return KPIValueOut(
+        id=kpi_value.id, kpi_id=kpi_value.kpi_id, periodtype=kpi_value.periodtype,
+        period_start=kpi_value.period.lower, period_end=kpi_value.period.upper, value=kpi_value.value
+    )
+
+# Bulk load values from a CSV or Parquet file (kpi_code, periodtype, period_start, period_end, value)
+@router.post("/value/import", dependencies=[Depends(require_role(ADMIN_ROLE))])
+def import_kpi_values(
+    file: UploadFile = File(...),
+    batch_size: int = Query(kpi_ingest_service.INGEST_BATCH_SIZE, ge=100, le=10000),
+    db: Session = Depends(get_db)
+):
+    batches = kpi_ingest_service.read_kpi_batches(file.file, file.filename, batch_size)
+    return kpi_ingest_service.ingest_kpi_values(batches, db)
+
+# List the values of a KPI overlapping a time range
+@router.get("/value", response_model=Page[KPIValueOut])
+def list_kpi_values(
+    kpi_code: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    periodtype: Optional[PeriodType] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    kpi_id = next(iter(_kpi_ids([kpi_code], db)))
+    return KPIValueService(db).list(kpi_id, page, start=start, end=end, periodtype=periodtype)
+
+# Rolled-up series of one or more KPIs, computed in SQL
+@router.get("/series", response_model=KPISeriesResponse)
+def get_kpi_series(
+    codes: List[str] = Query(...),
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    granularity: PeriodType = PeriodType.monthly,
+    aggregate: KPIAggregate = KPIAggregate.avg,
+    moving_average: Optional[int] = Query(None, ge=2, le=36, description="Window size in buckets"),
+    yoy: bool = False,
+    periodtype: Optional[PeriodType] = Query(None, description="Only use values reported with this period type"),
+    db: Session = Depends(get_db)
+):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    series = KPISeriesService(db).series(
+        _kpi_ids(codes, db), start, end, granularity=granularity, aggregate=aggregate.value,
+        moving_average=moving_average, yoy=yoy, periodtype=periodtype
+    )
+    return {"granularity": granularity, "aggregate": aggregate, "series": series}
 
 # List corrective actions for a KPI Value
 @router.get("/value/{kpi_value_id}/actions")
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, File, UploadFile
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
 from app.config.database import get_db
 from app.services import question_service
-from app.schemas.schema import QuestionCreate, QuestionUpdate, QuestionOut
+from app.schemas.schema import QuestionCreate, QuestionUpdate, QuestionOut, Page, ResponseType, CriticalityLevel
+from app.utils.pagination import PageParams
+from app.services.role_resolver import ADMIN_ROLE, require_role
 
 router = APIRouter(prefix="/question", tags=["Questions"])
 
 
-@router.post("/", response_model=QuestionOut)
+@router.post("/", response_model=QuestionOut, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def create_question(
     question: QuestionCreate,
     questionnaire_version_id: int,
@@ -17,26 +19,41 @@ def create_question(
     return question_service.create_question(question, questionnaire_version_id, db)
 
 
+@router.post("/import", dependencies=[Depends(require_role(ADMIN_ROLE))])
+def import_questions(
+    questionnaire_version_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    rows = question_service.read_question_file(file.file, file.filename)
+    return question_service.import_questions(rows, questionnaire_version_id, db)
+
+
 @router.get("/{question_id}", response_model=QuestionOut)
 def get_question(question_id: int, db: Session = Depends(get_db)):
     return question_service.get_question(question_id, db)
 
 
-@router.get("/", response_model=List[QuestionOut])
-def list_questions(db: Session = Depends(get_db)):
-    return question_service.list_questions(db)
+@router.get("/", response_model=Page[QuestionOut])
+def list_questions(
+    response_type: Optional[ResponseType] = None,
+    criticality: Optional[CriticalityLevel] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    return question_service.list_questions(page, db, response_type=response_type, criticality=criticality)
 
 
-@router.put("/{question_id}", response_model=QuestionOut)
+@router.put("/{question_id}", response_model=QuestionOut, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def update_question(question_id: int, data: QuestionUpdate, db: Session = Depends(get_db)):
     return question_service.update_question(question_id, data, db)
 
 
-@router.delete("/{question_id}")
+@router.delete("/{question_id}", dependencies=[Depends(require_role(ADMIN_ROLE))])
 def delete_question(question_id: int, db: Session = Depends(get_db)):
     return question_service.delete_question(question_id, db)
 
 
-@router.get("/by_version/{version_id}", response_model=List[QuestionOut])
-def get_questions_by_version(version_id: int, db: Session = Depends(get_db)):
-    return question_service.get_questions_by_version(version_id, db)
+@router.get("/by_version/{version_id}", response_model=Page[QuestionOut])
+def get_questions_by_version(version_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return question_service.get_questions_by_version(version_id, page, db)
@@ -1,21 +1,22 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from typing import List
 from app.config.database import get_db
 from app.services import questionnaire_service
-from app.schemas.schema import QuestionnaireCreate, QuestionnaireUpdate, QuestionnaireResponse
+from app.schemas.schema import QuestionnaireCreate, QuestionnaireUpdate, QuestionnaireResponse, Page, VersionCloneRequest
+from app.utils.pagination import PageParams
+from app.services.role_resolver import ADMIN_ROLE, require_role
 
 router = APIRouter(prefix="/questionnaire", tags=["Questionnaires"])
 
 
-@router.post("/add", response_model=QuestionnaireResponse)
+@router.post("/add", response_model=QuestionnaireResponse, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def create_questionnaire(data: QuestionnaireCreate, db: Session = Depends(get_db)):
     return questionnaire_service.create_questionnaire(data, db)
 
 
-@router.get("/getAll", response_model=List[QuestionnaireResponse])
-def get_questionnaires(db: Session = Depends(get_db)):
-    return questionnaire_service.get_all_questionnaires(db)
+@router.get("/getAll", response_model=Page[QuestionnaireResponse])
+def get_questionnaires(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return questionnaire_service.get_all_questionnaires(page, db)
 
 
 @router.get("/{questionnaire_id}", response_model=QuestionnaireResponse)
@@ -23,11 +24,16 @@ def get_questionnaire(questionnaire_id: int, db: Session = Depends(get_db)):
     return questionnaire_service.get_questionnaire(questionnaire_id, db)
 
 
-@router.put("/{questionnaire_id}", response_model=QuestionnaireResponse)
+@router.put("/{questionnaire_id}", response_model=QuestionnaireResponse, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def update_questionnaire(questionnaire_id: int, data: QuestionnaireUpdate, db: Session = Depends(get_db)):
     return questionnaire_service.update_questionnaire(questionnaire_id, data, db)
 
 
-@router.delete("/{questionnaire_id}")
+@router.delete("/{questionnaire_id}", dependencies=[Depends(require_role(ADMIN_ROLE))])
 def delete_questionnaire(questionnaire_id: int, db: Session = Depends(get_db)):
     return questionnaire_service.delete_questionnaire(questionnaire_id, db)
+
+
+@router.post("/{questionnaire_id}/versions/clone", dependencies=[Depends(require_role(ADMIN_ROLE))])
+def clone_questionnaire_version(questionnaire_id: int, data: VersionCloneRequest, db: Session = Depends(get_db)):
+    return questionnaire_service.clone_version(questionnaire_id, data, db)
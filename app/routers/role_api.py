@@ -4,11 +4,12 @@ from typing import List
 from app.config.database import get_db
 from app.services import role_service
 from app.schemas.schema import RoleCreate, RoleUpdate, RoleResponse, RoleAssignmentRequest
+from app.services.role_resolver import ADMIN_ROLE, require_role
 
 router = APIRouter(prefix="/role", tags=["Roles"])
 
 
-@router.post("/add")
+@router.post("/add", dependencies=[Depends(require_role(ADMIN_ROLE))])
 def create_role(data: RoleCreate, db: Session = Depends(get_db)):
     return role_service.create_role(data, db)
 
@@ -23,16 +24,16 @@ def get_role(code: str, db: Session = Depends(get_db)):
     return role_service.get_role(code, db)
 
 
-@router.put("/{code}", response_model=RoleResponse)
+@router.put("/{code}", response_model=RoleResponse, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def update_role(code: str, data: RoleUpdate, db: Session = Depends(get_db)):
     return role_service.update_role(code, data, db)
 
 
-@router.delete("/{code}")
+@router.delete("/{code}", dependencies=[Depends(require_role(ADMIN_ROLE))])
 def delete_role(code: str, db: Session = Depends(get_db)):
     return role_service.delete_role(code, db)
 
 
-@router.post("/assign-role")
+@router.post("/assign-role", dependencies=[Depends(require_role(ADMIN_ROLE))])
 def assign_role(request: RoleAssignmentRequest, db: Session = Depends(get_db)):
     return role_service.assign_role_to_user(request, db)
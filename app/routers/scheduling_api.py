@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config.database import get_db
+from app.models.models import User
+from app.schemas.schema import FreeSlot
+from app.services import scheduling_service
+
+router = APIRouter(prefix="/schedule", tags=["Scheduling"])
+
+
+def _user_ids(emails: List[str], db: Session):
+    users = dict(db.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+    missing = sorted(set(emails) - set(users))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+    return list(users.values())
+
+
+@router.get("/next-free-slot", response_model=FreeSlot)
+def next_free_slot(
+    emails: List[str] = Query(...),
+    duration_minutes: int = Query(..., ge=1),
+    after: datetime = Query(...),
+    db: Session = Depends(get_db)
+):
+    duration = timedelta(minutes=duration_minutes)
+    start = scheduling_service.next_free_slot(_user_ids(emails, db), duration, after, db)
+    if start is None:
+        raise HTTPException(status_code=404, detail="No free slot found for all users")
+    return {"start_time": start, "end_time": start + duration}
+
+
+@router.get("/conflicts")
+def list_conflicts(
+    emails: List[str] = Query(...),
+    start_time: datetime = Query(...),
+    end_time: datetime = Query(...),
+    db: Session = Depends(get_db)
+):
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    return scheduling_service.find_conflicts(
+        _user_ids(emails, db), scheduling_service.as_utc(start_time), scheduling_service.as_utc(end_time), db
+    )
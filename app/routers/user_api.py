@@ -1,24 +1,31 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.config.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db, get_async_db
 from app.services import user_service  
-from typing import List
+from typing import Optional
 import uuid
-from app.schemas.schema import UserCreate, UserResponse, UserUpdate
+from app.schemas.schema import Page, UserCreate, UserResponse, UserUpdate
+from app.utils.pagination import PageParams
+from app.services.role_resolver import ADMIN_ROLE, require_role
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 
 
-@router.post("/add", response_model=UserResponse)
+@router.post("/add", response_model=UserResponse, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def create_user(data: UserCreate, db: Session = Depends(get_db)):
     return user_service.create_user(data, db)
 
 
-@router.get("/all", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db)):
-    return user_service.get_all_users(db)
+@router.get("/all", response_model=Page[UserResponse])
+async def get_all_users(
+    active: Optional[bool] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await user_service.get_all_users(page, db, active=active)
 
 
 @router.get("/{user_email}", response_model=UserResponse)
@@ -27,11 +34,11 @@ def get_user_by_email(user_email: str, db: Session = Depends(get_db)):
 
 
 
-@router.put("/{user_email}", response_model=UserResponse)
+@router.put("/{user_email}", response_model=UserResponse, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def update_user(user_email: str, data: UserUpdate, db: Session = Depends(get_db)):
     return user_service.update_user(user_email, data, db)
 
 
-@router.delete("/{user_id}", response_model=dict)
+@router.delete("/{user_id}", response_model=dict, dependencies=[Depends(require_role(ADMIN_ROLE))])
 def delete_user(user_id: uuid.UUID, db: Session = Depends(get_db)):
     return user_service.delete_user(user_id, db)
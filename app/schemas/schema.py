@@ -1,10 +1,25 @@
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
-from typing import  Optional
+from typing import  Generic, List, Optional, TypeVar
 import uuid
 from enum import Enum
- 
-   
-from app.routers.corrective_action_api import CorrectiveActionStatus
+
+
+class CorrectiveActionStatus(str, Enum):
+    opened = "opened"
+    in_progress = "in_progress"
+    closed = "closed"
+    completed = "completed"
+    postponed = "postponed"
+
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 
 class UserCreate(BaseModel):
     first_name: str
@@ -83,6 +98,13 @@ class QuestionnaireResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class VersionCloneRequest(BaseModel):
+    source_version_no: Optional[int] = None  # latest version when omitted
+    status: str = "draft"
+    add_question_ids: List[int] = []
+    remove_question_ids: List[int] = []
+
+
 
 class RoleCreate(BaseModel):
     code: str
@@ -119,6 +141,48 @@ class CorrectiveActionUpdate(BaseModel):
     status: Optional[CorrectiveActionStatus]
 
 
+class StatusCount(BaseModel):
+    status: Optional[CorrectiveActionStatus] = None
+    count: int
+
+
+class EntityBacklog(BaseModel):
+    entity_id: Optional[int] = None
+    entity_code: Optional[str] = None
+    open: int
+    total: int
+
+
+class AuditBacklog(BaseModel):
+    audit_id: Optional[int] = None
+    open: int
+    total: int
+
+
+class AgeBucketCount(BaseModel):
+    age_bucket: str
+    count: int
+
+
+class OpenCorrectiveAction(BaseModel):
+    id: int
+    title: Optional[str] = None
+    status: Optional[CorrectiveActionStatus] = None
+    created_at: datetime
+    audit_id: Optional[int] = None
+    entity_id: Optional[int] = None
+
+
+class CorrectiveActionBacklog(BaseModel):
+    total: int
+    open: int
+    by_status: List[StatusCount]
+    by_entity: List[EntityBacklog]
+    by_audit: List[AuditBacklog]
+    by_age: List[AgeBucketCount]
+    oldest_open: List[OpenCorrectiveAction]
+
+
 class FindingOut(BaseModel):
     id: int
     audit_question_id: int
@@ -128,6 +192,11 @@ class FindingOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 class FindingUpdate(BaseModel):
     type: Optional[str] = None
     audit_question_id: Optional[int] = None
@@ -156,8 +225,17 @@ class EntityResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
-from datetime import datetime
- 
+class EntityTreeNode(EntityResponse):
+    id: int
+    parent_id: Optional[int] = None
+    depth: int
+
+
+
+class ConflictPolicy(str, Enum):
+    reject = "reject"
+    shift = "shift"
+
 
 class AuditRequest(BaseModel):
     entity_code: str
@@ -166,6 +244,8 @@ class AuditRequest(BaseModel):
     auditee_email: str
     start_time: datetime
     end_time: datetime
+    # shift moves the audit to the next slot where both participants are free
+    on_conflict: ConflictPolicy = ConflictPolicy.reject
 
 
 class RescheduleRequest(BaseModel):
@@ -173,6 +253,12 @@ class RescheduleRequest(BaseModel):
     new_start_time: Optional[datetime] = None
     new_end_time: Optional[datetime] = None
     reason: Optional[str] = None
+    on_conflict: ConflictPolicy = ConflictPolicy.reject
+
+
+class FreeSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
 
 
 class AuditResponse(BaseModel):
@@ -184,6 +270,11 @@ class AuditResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class AuditListItem(AuditResponse):
+    entity_id: Optional[int] = None
+    questionnaire_version_id: Optional[int] = None
+
+
 class AuditDetailResponse(BaseModel):
     audit_id: int
     status: str
@@ -208,7 +299,96 @@ class KPIDefinitionUpdate(BaseModel):
     label: Optional[str] = None
     type: Optional[KPIType] = None
 
+class KPIThresholds(BaseModel):
+    target: Optional[int] = None
+    threshold_min: Optional[int] = None
+    threshold_max: Optional[int] = None
+
 class KPIDefinitionOut(KPIDefinitionBase):
     id: int
+    target: Optional[int] = None
+    threshold_min: Optional[int] = None
+    threshold_max: Optional[int] = None
 
     model_config = {"from_attributes": True}
+
+
+from app.models.models import PeriodType
+
+
+class KPIAggregate(str, Enum):
+    avg = "avg"
+    sum = "sum"
+    min = "min"
+    max = "max"
+
+
+class KPIValueOut(BaseModel):
+    id: int
+    kpi_id: int
+    periodtype: Optional[PeriodType] = None
+    period_start: Optional[datetime] = None
+    period_end: Optional[datetime] = None
+    value: Optional[int] = None
+
+    model_config = {"from_attributes": True}
+
+
+class KPISeriesPoint(BaseModel):
+    bucket: datetime
+    value: Optional[float] = None
+    samples: int
+    moving_average: Optional[float] = None
+    previous_year_value: Optional[float] = None
+    yoy_delta: Optional[float] = None
+    yoy_pct: Optional[float] = None
+
+
+class KPISeriesResponse(BaseModel):
+    granularity: PeriodType
+    aggregate: KPIAggregate
+    series: dict[str, List[KPISeriesPoint]]
+
+
+class KPIEvaluationReport(BaseModel):
+    from_seq: int
+    to_seq: int
+    values_evaluated: int
+    actions_created: int
+
+
+from app.models.models import ScoreType
+
+
+class AuditStats(BaseModel):
+    audits: int
+    planned: int
+    confirmed: int
+    postponed: int
+    cancelled: int
+    scored: int
+    findings: int
+    findings_per_audit: float
+    cancellation_rate: float
+    postponement_rate: float
+
+
+class EntityAuditStats(AuditStats):
+    entity_id: int
+    entity_code: Optional[str] = None
+
+
+class QuestionnaireAuditStats(AuditStats):
+    questionnaire_id: int
+    questionnaire_code: Optional[str] = None
+
+
+class AuditorStats(AuditStats):
+    user_id: uuid.UUID
+    email: str
+
+
+class ScoreBucket(BaseModel):
+    final_score_type: Optional[ScoreType] = None
+    final_score: str
+    audits: int
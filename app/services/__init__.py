@@ -1,3 +0,0 @@
-from .corrective_action_service import *
-from .finding_service import *
- 
\ No newline at end of file
@@ -0,0 +1,90 @@
+from time import perf_counter
+from sqlalchemy import select, func, cast, Float, Numeric, text
+from sqlalchemy.orm import Session
+from app.models.analytics import VIEW_DEFINITIONS, audit_stats, auditor_stats, score_distribution
+from app.models.models import AuditStatus, Entity, Questionnaire, User
+from app.services.entity_service import entity_filter
+from app.utils.pagination import PageParams, build_page, keyset
+
+
+def _stats_columns(view):
+    """Per-key totals summed over the view's status rows, with the derived rates."""
+    audits = func.sum(view.c.audits)
+
+    def audits_with(status):
+        return func.coalesce(func.sum(view.c.audits).filter(view.c.status == status), 0)
+
+    def per_audit(count):
+        # audits is never 0: every view row counts at least one audit
+        return cast(func.round(cast(count, Numeric) / audits, 4), Float)
+
+    return [
+        audits.label("audits"),
+        *[audits_with(status).label(status.value) for status in AuditStatus],
+        func.sum(view.c.scored).label("scored"),
+        func.sum(view.c.findings).label("findings"),
+        per_audit(func.sum(view.c.findings)).label("findings_per_audit"),
+        per_audit(audits_with(AuditStatus.cancelled)).label("cancellation_rate"),
+        per_audit(audits_with(AuditStatus.postponed)).label("postponement_rate"),
+    ]
+
+
+def _entity_scope(stmt, view, entity_id: int, include_descendants: bool):
+    if entity_id is None:
+        return stmt
+    return stmt.where(entity_filter(view.c.entity_id, entity_id, include_descendants))
+
+
+def stats_by_entity(page: PageParams, db: Session, entity_id: int = None, include_descendants: bool = False):
+    key = audit_stats.c.entity_id
+    stmt = (
+        select(key, Entity.code.label("entity_code"), *_stats_columns(audit_stats))
+        .join(Entity, Entity.id == key)
+        .group_by(key, Entity.code)
+    )
+    stmt = _entity_scope(stmt, audit_stats, entity_id, include_descendants)
+    return build_page(db.execute(keyset(stmt, [key], page)).all(), [key], page)
+
+
+def stats_by_questionnaire(page: PageParams, db: Session, entity_id: int = None, include_descendants: bool = False):
+    key = audit_stats.c.questionnaire_id
+    stmt = (
+        select(key, Questionnaire.code.label("questionnaire_code"), *_stats_columns(audit_stats))
+        .join(Questionnaire, Questionnaire.id == key)
+        .group_by(key, Questionnaire.code)
+    )
+    stmt = _entity_scope(stmt, audit_stats, entity_id, include_descendants)
+    return build_page(db.execute(keyset(stmt, [key], page)).all(), [key], page)
+
+
+def stats_by_auditor(page: PageParams, db: Session):
+    key = auditor_stats.c.user_id
+    stmt = (
+        select(key, User.email, *_stats_columns(auditor_stats))
+        .join(User, User.id == key)
+        .group_by(key, User.email)
+    )
+    return build_page(db.execute(keyset(stmt, [key], page)).all(), [key], page)
+
+
+def get_score_distribution(db: Session, entity_id: int = None, include_descendants: bool = False,
+                           questionnaire_id: int = None):
+    stmt = select(
+        score_distribution.c.final_score_type, score_distribution.c.final_score,
+        func.sum(score_distribution.c.audits).label("audits"),
+    ).group_by(score_distribution.c.final_score_type, score_distribution.c.final_score)
+    stmt = _entity_scope(stmt, score_distribution, entity_id, include_descendants)
+    if questionnaire_id is not None:
+        stmt = stmt.where(score_distribution.c.questionnaire_id == questionnaire_id)
+    return db.execute(stmt.order_by(score_distribution.c.final_score_type, score_distribution.c.final_score)).all()
+
+
+def refresh_views(db: Session):
+    """Rebuild every analytics view without locking out readers; returns seconds per view."""
+    timings = {}
+    for name in VIEW_DEFINITIONS:
+        started = perf_counter()
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+        db.commit()
+        timings[name] = round(perf_counter() - started, 3)
+    return timings
@@ -0,0 +1,245 @@
+from datetime import timedelta
+from typing import List, Optional
+from sqlalchemy import select, insert, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from fastapi import HTTPException
+from app.models.models import (
+    Audit, AuditParticipant, AuditQuestion, AuditSession, Entity, Questionnaire, QuestionnaireVersion,
+    QuestionnaireVersionQuestion, User, UserRole
+)
+from app.schemas.schema import AuditRequest
+from app.services import scheduling_service
+from app.services.entity_service import entity_filter
+from app.utils.pagination import PageParams, apply_filters, build_page, keyset
+
+MAX_SESSION_DURATION = timedelta(hours=2)
+
+
+def split_into_sessions(start_time, end_time, max_duration: timedelta = MAX_SESSION_DURATION):
+    """Cut [start_time, end_time) into consecutive slots no longer than max_duration."""
+    slots = []
+    current_start = start_time
+    while current_start < end_time:
+        current_end = min(current_start + max_duration, end_time)
+        slots.append((current_start, current_end))
+        current_start = current_end
+    return slots
+
+
+def list_audits(page: PageParams, db: Session, status: str = None, entity_id: int = None,
+                include_descendants: bool = False):
+    stmt = apply_filters(select(Audit), {Audit.status: status})
+    if entity_id is not None:
+        stmt = stmt.where(entity_filter(Audit.entity_id, entity_id, include_descendants))
+    return build_page(db.execute(keyset(stmt, [Audit.id], page)).scalars().all(), [Audit.id], page)
+
+
+def audit_detail_query(audit_id: int):
+    # Entity and questionnaire are many-to-one, so they ride along in the main query;
+    # sessions and participants (with their users) come back in one extra IN query each
+    return (
+        select(Audit)
+        .where(Audit.id == audit_id)
+        .options(
+            joinedload(Audit.entity),
+            joinedload(Audit.questionnaire_version).joinedload(QuestionnaireVersion.questionnaire),
+            selectinload(Audit.sessions),
+            selectinload(Audit.participants).joinedload(AuditParticipant.user),
+        )
+    )
+
+
+def get_audit_detail(audit_id: int, db: Session):
+    audit = db.execute(audit_detail_query(audit_id)).unique().scalar_one_or_none()
+    if not audit:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    return audit
+
+
+async def get_audit_detail_async(audit_id: int, db: AsyncSession):
+    result = await db.execute(audit_detail_query(audit_id))
+    audit = result.unique().scalar_one_or_none()
+    if not audit:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    return audit
+
+
+def serialize_audit_detail(audit: Audit):
+    entity = audit.entity
+    qv = audit.questionnaire_version
+    questionnaire = qv.questionnaire if qv else None
+    return {
+        "audit_id": audit.id,
+        "status": audit.status,
+        "entity": {
+            "type": entity.type if entity else None,
+            "code": entity.code if entity else None,
+            "label": entity.label if entity else None
+        },
+        "questionnaire": {
+            "code": questionnaire.code if questionnaire else None,
+            "version": qv.version_no if qv else None
+        },
+        "sessions": [
+            {"start_time": s.start_time, "end_time": s.end_time}
+            for s in audit.sessions
+        ],
+        "participants": [
+            {"email": p.user.email if p.user else None, "role": p.local_role}
+            for p in audit.participants
+        ]
+    }
+
+
+def materialize_audit_questions(audit_ids: List[int], db: Session, question_ids: Optional[List[int]] = None):
+    """Create the AuditQuestion rows of each audit's questionnaire version with one INSERT ... SELECT.
+
+    Questions the audit already has are skipped, so calling it again is harmless. question_ids
+    restricts the insert to a subset of the version's questions. Returns the number of rows added.
+    """
+    links = (
+        select(Audit.id, QuestionnaireVersionQuestion.question_id)
+        .join(
+            QuestionnaireVersionQuestion,
+            QuestionnaireVersionQuestion.questionnaire_version_id == Audit.questionnaire_version_id
+        )
+        .where(Audit.id.in_(audit_ids))
+        .where(~exists().where(
+            AuditQuestion.audit_id == Audit.id,
+            AuditQuestion.question_id == QuestionnaireVersionQuestion.question_id
+        ))
+    )
+    if question_ids is not None:
+        links = links.where(QuestionnaireVersionQuestion.question_id.in_(question_ids))
+    result = db.execute(
+        pg_insert(AuditQuestion)
+        .from_select(["audit_id", "question_id"], links)
+        .on_conflict_do_nothing(constraint="uq_audit_question_audit_question")
+    )
+    return result.rowcount
+
+
+def add_audit_question(audit_id: int, question_id: int, db: Session):
+    """Link one question to an audit; 409 when the audit already has it."""
+    audit_question_id = db.execute(
+        pg_insert(AuditQuestion)
+        .values(audit_id=audit_id, question_id=question_id)
+        .on_conflict_do_nothing(constraint="uq_audit_question_audit_question")
+        .returning(AuditQuestion.id)
+    ).scalar()
+    if audit_question_id is None:
+        raise HTTPException(status_code=409, detail=f"Question {question_id} is already part of audit {audit_id}")
+    return audit_question_id
+
+
+def _utc_range(request: AuditRequest):
+    return scheduling_service.as_utc(request.start_time), scheduling_service.as_utc(request.end_time)
+
+
+def _plan_error(index: int, status_code: int, detail: str):
+    return {"index": index, "status": "error", "status_code": status_code, "detail": detail}
+
+
+def plan_audits_bulk(requests: List[AuditRequest], db: Session):
+    """Plan many audits with one lookup query per kind of reference and one transaction.
+
+    Every request gets a result entry; invalid ones are reported and skipped, the rest are inserted.
+    """
+    entity_codes = {r.entity_code for r in requests}
+    questionnaire_codes = {r.questionnaire_code for r in requests}
+    emails = {r.auditor_email for r in requests} | {r.auditee_email for r in requests}
+
+    entities = dict(db.execute(select(Entity.code, Entity.id).where(Entity.code.in_(entity_codes))).all())
+    known_questionnaires = set(
+        db.execute(select(Questionnaire.code).where(Questionnaire.code.in_(questionnaire_codes))).scalars()
+    )
+    # DISTINCT ON keeps the highest version_no of each questionnaire
+    latest_versions = dict(db.execute(
+        select(Questionnaire.code, QuestionnaireVersion.id)
+        .join(QuestionnaireVersion, QuestionnaireVersion.questionnaire_id == Questionnaire.id)
+        .where(Questionnaire.code.in_(questionnaire_codes))
+        .order_by(Questionnaire.code, QuestionnaireVersion.version_no.desc())
+        .distinct(Questionnaire.code)
+    ).all())
+    users = dict(db.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+    user_roles = set(db.execute(
+        select(UserRole.user_id, UserRole.role_code)
+        .where(UserRole.user_id.in_(users.values()), UserRole.role_code.in_(["auditor", "auditee"]))
+    ).all())
+    # Existing bookings over the whole batch span in one range query; accepted requests are added
+    # as the loop goes so two audits of the same batch cannot overlap either
+    busy = {}
+    valid_times = [r for r in requests if r.end_time > r.start_time]
+    if valid_times and users:
+        busy = scheduling_service.busy_intervals(
+            list(users.values()),
+            min(scheduling_service.as_utc(r.start_time) for r in valid_times),
+            max(scheduling_service.as_utc(r.end_time) for r in valid_times),
+            db
+        )
+
+    results = []
+    planned = []
+    for index, r in enumerate(requests):
+        auditor_id = users.get(r.auditor_email)
+        auditee_id = users.get(r.auditee_email)
+        if r.entity_code not in entities:
+            results.append(_plan_error(index, 404, f"Entity '{r.entity_code}' not found"))
+        elif r.questionnaire_code not in known_questionnaires:
+            results.append(_plan_error(index, 404, f"Questionnaire '{r.questionnaire_code}' not found"))
+        elif r.questionnaire_code not in latest_versions:
+            results.append(_plan_error(index, 404, f"No version found for questionnaire '{r.questionnaire_code}'"))
+        elif not auditor_id or not auditee_id:
+            results.append(_plan_error(index, 404, "Auditor or Auditee not found"))
+        elif (auditor_id, "auditor") not in user_roles:
+            results.append(_plan_error(index, 403, f"User '{r.auditor_email}' does not have 'auditor' role"))
+        elif (auditee_id, "auditee") not in user_roles:
+            results.append(_plan_error(index, 403, f"User '{r.auditee_email}' does not have 'auditee' role"))
+        elif r.end_time <= r.start_time:
+            results.append(_plan_error(index, 400, "Invalid session duration: end_time must be after start_time"))
+        elif any(
+            scheduling_service.overlaps(busy.get(user_id, []), *_utc_range(r)) for user_id in (auditor_id, auditee_id)
+        ):
+            results.append(_plan_error(index, 409, "Participants are already booked in this time range"))
+        else:
+            results.append({"index": index, "status": "planned"})
+            planned.append((index, r, auditor_id, auditee_id))
+            for user_id in (auditor_id, auditee_id):
+                busy.setdefault(user_id, []).append(_utc_range(r))
+
+    if not planned:
+        return {"planned": 0, "failed": len(results), "results": results}
+
+    audit_ids = db.execute(
+        insert(Audit).returning(Audit.id, sort_by_parameter_order=True),
+        [
+            {
+                "entity_id": entities[r.entity_code],
+                "questionnaire_version_id": latest_versions[r.questionnaire_code],
+                "status": "planned",
+                "final_score_type": "scale",
+                "final_score": None,
+            }
+            for _, r, _, _ in planned
+        ]
+    ).scalars().all()
+
+    session_rows = []
+    participant_rows = []
+    for audit_id, (index, r, auditor_id, auditee_id) in zip(audit_ids, planned):
+        results[index]["audit_id"] = audit_id
+        session_rows.extend(
+            {"audit_id": audit_id, "start_time": start, "end_time": end}
+            for start, end in split_into_sessions(*_utc_range(r))
+        )
+        participant_rows.append({"audit_id": audit_id, "user_id": auditor_id, "local_role": "auditor"})
+        participant_rows.append({"audit_id": audit_id, "user_id": auditee_id, "local_role": "auditee"})
+
+    db.execute(insert(AuditSession), session_rows)
+    db.execute(insert(AuditParticipant), participant_rows)
+    scheduling_service.book_audits(audit_ids, db)
+    materialize_audit_questions(audit_ids, db)
+    db.commit()
+    return {"planned": len(planned), "failed": len(results) - len(planned), "results": results}
@@ -0,0 +1,110 @@
+import io
+import os
+from datetime import timedelta
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.models import Blob, AuditResponse, Attachment
+from app.utils import blob_store
+
+# Unreferenced blobs younger than this are kept: their referencing row may not be committed yet
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", 3600))
+
+
+def register_blob(digest: str, size: int, db: Session):
+    """Insert the blob row, or refresh registered_at when it exists.
+
+    The row starts unreferenced; the ref_count triggers count the rows that point at it. Either
+    way the row stays locked until the caller commits, which keeps collect_garbage off it.
+    """
+    db.execute(
+        insert(Blob)
+        .values(digest=digest, size=size, ref_count=0)
+        .on_conflict_do_update(index_elements=[Blob.digest], set_={"registered_at": func.now()})
+    )
+
+
+def store_content(writer: blob_store.BlobWriter, db: Session):
+    """Register a finished BlobWriter's content, then move its file into place."""
+    digest, size = writer.finish()
+    # After the row lock: a collection that removed this digest has finished, so the file
+    # check in commit() cannot race with its unlink
+    register_blob(digest, size, db)
+    return writer.commit()
+
+
+def store_upload(stream, db: Session):
+    with blob_store.BlobWriter() as writer:
+        blob_store.copy_stream(stream, writer)
+        return store_content(writer, db)
+
+
+def dedup_stats(db: Session):
+    blobs, stored_bytes, references, logical_bytes = db.execute(
+        select(
+            func.count(Blob.digest),
+            func.coalesce(func.sum(Blob.size), 0),
+            func.coalesce(func.sum(Blob.ref_count), 0),
+            func.coalesce(func.sum(Blob.size * Blob.ref_count), 0),
+        ).where(Blob.ref_count > 0)
+    ).one()
+    # sum() over BIGINT comes back as NUMERIC (Decimal), which json.dumps cannot encode
+    stored_bytes, references, logical_bytes = int(stored_bytes), int(references), int(logical_bytes)
+    return {
+        "blobs": blobs,
+        "references": references,
+        "stored_bytes": stored_bytes,
+        "logical_bytes": logical_bytes,
+        "dedup_ratio": round(logical_bytes / stored_bytes, 3) if stored_bytes else 1.0,
+    }
+
+
+def collect_garbage(db: Session, grace_seconds: int = BLOB_GC_GRACE_SECONDS):
+    """Drop blobs nothing has referenced for the grace period and remove their files.
+
+    Rows being registered are locked and skipped. Files are removed before the deletes commit,
+    so an upload of the same content, which waits on the row lock, finds the file gone and
+    writes it again.
+    """
+    digests = db.execute(
+        select(Blob.digest)
+        .where(Blob.ref_count <= 0, Blob.registered_at < func.now() - timedelta(seconds=grace_seconds))
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    # Re-checked under the lock: a reference may have been added since the snapshot
+    digests = db.execute(
+        delete(Blob).where(Blob.digest.in_(digests), Blob.ref_count <= 0).returning(Blob.digest)
+    ).scalars().all()
+    for digest in digests:
+        blob_store.delete_blob(digest)
+    db.commit()
+    return len(digests)
+
+
+def _migrate_inline(model, content_column, db: Session, batch_size: int):
+    migrated = 0
+    while True:
+        rows = db.execute(
+            select(model.id, content_column)
+            .where(content_column.isnot(None), model.content_digest.is_(None))
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return migrated
+        for row_id, content in rows:
+            digest, size = store_upload(io.BytesIO(content), db)
+            db.query(model).filter_by(id=row_id).update(
+                {model.content_digest: digest, model.content_size: size, content_column: None},
+                synchronize_session=False
+            )
+        db.commit()
+        migrated += len(rows)
+
+
+def migrate_inline_content(db: Session, batch_size: int = 50):
+    """Move BYTEA content of existing responses and attachments into the blob store."""
+    return {
+        "responses": _migrate_inline(AuditResponse, AuditResponse.value, db, batch_size),
+        "attachments": _migrate_inline(Attachment, Attachment.object, db, batch_size),
+    }
@@ -1,6 +1,12 @@
+from datetime import timedelta
+from sqlalchemy import select, func, case, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.models.models import CorrectiveAction
+from app.models.models import Audit, CorrectiveAction, CorrectiveActionStatus, Entity, Finding
+from app.services.entity_service import entity_filter
+from app.utils.pagination import PageParams, apply_filters, build_page, keyset
 
 def get_corrective_action(action_id: int, db: Session):
     action = db.query(CorrectiveAction).filter_by(id=action_id).first()
@@ -8,11 +14,130 @@ def get_corrective_action(action_id: int, db: Session):
         raise HTTPException(status_code=404, detail="Corrective action not found")
     return action
 
-def list_corrective_actions(db: Session):
-    return db.query(CorrectiveAction).all()
+async def list_corrective_actions(page: PageParams, db: AsyncSession, status: str = None, finding_id: int = None,
+                                  entity_id: int = None, include_descendants: bool = False):
+    stmt = apply_filters(select(CorrectiveAction), {
+        CorrectiveAction.status: status,
+        CorrectiveAction.finding_id: finding_id,
+    })
+    if entity_id is not None:
+        stmt = (
+            stmt.join(Finding, Finding.id == CorrectiveAction.finding_id)
+            .join(Audit, Audit.id == Finding.audit_id)
+            .where(entity_filter(Audit.entity_id, entity_id, include_descendants))
+        )
+    result = await db.execute(keyset(stmt, [CorrectiveAction.id], page))
+    return build_page(result.scalars().all(), [CorrectiveAction.id], page)
 
-def get_actions_by_status(status: str, db: Session):
-    return db.query(CorrectiveAction).filter_by(status=status).all()
+def get_actions_by_status(status: str, page: PageParams, db: Session):
+    stmt = select(CorrectiveAction).where(CorrectiveAction.status == status)
+    return build_page(db.execute(keyset(stmt, [CorrectiveAction.id], page)).scalars().all(), [CorrectiveAction.id], page)
+
+# Upper bound (days) and label of each age bucket of open actions; older ones fall in the last label
+BACKLOG_AGE_BUCKETS = [(7, "0-7d"), (30, "8-30d"), (90, "31-90d")]
+BACKLOG_OLDEST_BUCKET = "90d+"
+BACKLOG_AGE_LABELS = [label for _, label in BACKLOG_AGE_BUCKETS] + [BACKLOG_OLDEST_BUCKET]
+
+# GROUPING(status, entity_id, audit_id, age_bucket) of each grouping set: a bit is set for every
+# column the row is not grouped by
+_BY_STATUS, _BY_ENTITY, _BY_AUDIT, _BY_AGE, _TOTAL = 0b0111, 0b1011, 0b1101, 0b1110, 0b1111
+
+
+def _json_list(rows, order_by, **fields):
+    """json_agg of one object per row of rows (a subquery), [] when there is none."""
+    return select(func.coalesce(
+        func.json_agg(aggregate_order_by(
+            func.json_build_object(*[part for name, column in fields.items() for part in (name, column)]),
+            *order_by
+        )),
+        literal_column("'[]'::json")
+    )).select_from(rows).scalar_subquery()
+
+
+def get_backlog(db: Session, top: int = 10, entity_id: int = None, include_descendants: bool = False):
+    """Counts by status, entity, audit and age plus the oldest open actions, in one statement.
+
+    Entities and audits are only listed while they have open actions; audits are limited to
+    the top with the most open ones.
+    """
+    is_open = CorrectiveAction.status.is_distinct_from(CorrectiveActionStatus.completed)
+    now = func.now()
+    age_bucket = case(
+        (~is_open, None),
+        *[(CorrectiveAction.created_at > now - timedelta(days=days), label) for days, label in BACKLOG_AGE_BUCKETS],
+        else_=BACKLOG_OLDEST_BUCKET
+    )
+    actions = (
+        select(
+            CorrectiveAction.id, CorrectiveAction.title, CorrectiveAction.status, CorrectiveAction.created_at,
+            Finding.audit_id, Audit.entity_id, is_open.label("is_open"), age_bucket.label("age_bucket"),
+        )
+        .outerjoin(Finding, Finding.id == CorrectiveAction.finding_id)
+        .outerjoin(Audit, Audit.id == Finding.audit_id)
+    )
+    if entity_id is not None:
+        actions = actions.where(entity_filter(Audit.entity_id, entity_id, include_descendants))
+    actions = actions.cte("actions")
+
+    keys = [actions.c.status, actions.c.entity_id, actions.c.audit_id, actions.c.age_bucket]
+    counts = (
+        select(
+            *keys,
+            func.grouping(*keys).label("grouping"),
+            func.count().label("total"),
+            func.count().filter(actions.c.is_open).label("open"),
+        )
+        .group_by(func.grouping_sets(*[tuple_(key) for key in keys], tuple_()))
+        .cte("counts")
+    )
+
+    def counts_of(grouping: int):
+        return select(counts).where(counts.c.grouping == grouping)
+
+    by_status = counts_of(_BY_STATUS).subquery()
+    by_entity = (
+        counts_of(_BY_ENTITY).add_columns(Entity.code.label("entity_code"))
+        .outerjoin(Entity, Entity.id == counts.c.entity_id)
+        .where(counts.c.open > 0)
+        .subquery()
+    )
+    by_audit = (
+        counts_of(_BY_AUDIT).where(counts.c.open > 0)
+        .order_by(counts.c.open.desc(), counts.c.audit_id).limit(top)
+        .subquery()
+    )
+    by_age = counts_of(_BY_AGE).where(counts.c.age_bucket.isnot(None)).subquery()
+    totals = counts_of(_TOTAL).subquery()
+    oldest = (
+        select(actions).where(actions.c.is_open)
+        .order_by(actions.c.created_at, actions.c.id).limit(top)
+        .subquery()
+    )
+
+    row = db.execute(select(
+        select(totals.c.total).scalar_subquery().label("total"),
+        select(totals.c.open).scalar_subquery().label("open"),
+        _json_list(by_status, [by_status.c.status], status=by_status.c.status, count=by_status.c.total)
+        .label("by_status"),
+        _json_list(
+            by_entity, [by_entity.c.open.desc(), by_entity.c.entity_id],
+            entity_id=by_entity.c.entity_id, entity_code=by_entity.c.entity_code,
+            open=by_entity.c.open, total=by_entity.c.total,
+        ).label("by_entity"),
+        _json_list(
+            by_audit, [by_audit.c.open.desc(), by_audit.c.audit_id],
+            audit_id=by_audit.c.audit_id, open=by_audit.c.open, total=by_audit.c.total,
+        ).label("by_audit"),
+        _json_list(
+            by_age, [func.array_position(array(BACKLOG_AGE_LABELS), by_age.c.age_bucket)], age_bucket=by_age.c.age_bucket, count=by_age.c.open,
+        ).label("by_age"),
+        _json_list(
+            oldest, [oldest.c.created_at, oldest.c.id],
+            id=oldest.c.id, title=oldest.c.title, status=oldest.c.status, created_at=oldest.c.created_at,
+            audit_id=oldest.c.audit_id, entity_id=oldest.c.entity_id,
+        ).label("oldest_open"),
+    )).one()
+    return {**row._mapping, "total": row.total or 0, "open": row.open or 0}
 
 def update_corrective_action(action_id: int, update_data: dict, db: Session):
     action = db.query(CorrectiveAction).filter_by(id=action_id).first()
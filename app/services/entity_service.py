@@ -1,7 +1,47 @@
+import os
+from sqlalchemy import select, literal_column, Integer
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.models.models import Entity
+from app.models.models import Entity, EntityClosure
 from app.schemas.schema import EntityCreate, EntityUpdate
+from app.services import reference_cache
+from app.utils.pagination import PageParams, apply_filters, build_page, keyset
+
+
+# The closure table answers subtree queries with one indexed lookup; turn it off to fall back to
+# a recursive CTE over parent_id (e.g. before the v0004 migration has run)
+ENTITY_CLOSURE_ENABLED = os.getenv("ENTITY_CLOSURE_ENABLED", "true").lower() == "true"
+
+
+def hierarchy(entity_id: int, ancestors: bool = False):
+    """Subquery of (id, depth) for the subtree below entity_id, or its ancestor chain, self included."""
+    if ENTITY_CLOSURE_ENABLED:
+        if ancestors:
+            related, anchor = EntityClosure.ancestor_id, EntityClosure.descendant_id
+        else:
+            related, anchor = EntityClosure.descendant_id, EntityClosure.ancestor_id
+        return select(related.label("id"), EntityClosure.depth).where(anchor == entity_id).subquery("hierarchy")
+
+    tree = (
+        select(Entity.id, Entity.parent_id, literal_column("0", Integer).label("depth"))
+        .where(Entity.id == entity_id)
+        .cte("hierarchy_tree", recursive=True)
+    )
+    previous = tree.alias("previous")
+    step = Entity.id == previous.c.parent_id if ancestors else Entity.parent_id == previous.c.id
+    tree = tree.union_all(select(Entity.id, Entity.parent_id, previous.c.depth + 1).where(step))
+    return select(tree.c.id, tree.c.depth).subquery("hierarchy")
+
+
+def descendant_ids(entity_id: int):
+    return select(hierarchy(entity_id).c.id)
+
+
+def entity_filter(column, entity_id: int, include_descendants: bool = False):
+    """WHERE clause matching entity_id, or its whole subtree, on an entity_id column."""
+    if include_descendants:
+        return column.in_(descendant_ids(entity_id))
+    return column == entity_id
 
 
 def create_entity(data: EntityCreate, db: Session):
@@ -18,14 +58,16 @@ def create_entity(data: EntityCreate, db: Session):
     db.add(new_entity)
     db.commit()
     db.refresh(new_entity)
+    reference_cache.entities.invalidate()
     return new_entity
 
 
-def get_all_entities(db: Session):
-    entities = db.query(Entity).all()
-    if not entities:
+def get_all_entities(page: PageParams, db: Session, type: str = None, parent_id: int = None):
+    stmt = apply_filters(select(Entity), {Entity.type: type, Entity.parent_id: parent_id})
+    entities = db.execute(keyset(stmt, [Entity.id], page)).scalars().all()
+    if not entities and not page.cursor:
         raise HTTPException(status_code=404, detail="No entities found")
-    return entities
+    return build_page(entities, [Entity.id], page)
 
 
 def get_entity_by_code(entity_code: str, db: Session):
@@ -40,10 +82,18 @@ def update_entity(entity_code: str, data: EntityUpdate, db: Session):
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
 
-    for key, value in data.model_dump(exclude_unset=True).items():
+    changes = data.model_dump(exclude_unset=True)
+    new_parent_id = changes.get("parent_id")
+    if new_parent_id is not None and new_parent_id != entity.parent_id:
+        tree = hierarchy(entity.id)
+        if db.execute(select(tree.c.id).where(tree.c.id == new_parent_id)).first():
+            raise HTTPException(status_code=400, detail="An entity cannot be moved under itself or one of its descendants")
+
+    for key, value in changes.items():
         setattr(entity, key, value)
     db.commit()
     db.refresh(entity)
+    reference_cache.entities.invalidate()
     return entity
 
 
@@ -53,4 +103,30 @@ def delete_entity(entity_id: int, db: Session):
         raise HTTPException(status_code=404, detail="Entity not found")
     db.delete(entity)
     db.commit()
+    reference_cache.entities.invalidate()
     return {"message": f"Entity {entity_id} deleted successfully"}
+
+
+def get_descendants(entity_code: str, page: PageParams, db: Session, max_depth: int = None):
+    entity = get_entity_by_code(entity_code, db)
+    tree = hierarchy(entity.id)
+    stmt = (
+        select(Entity.id, Entity.type, Entity.code, Entity.label, Entity.parent_id, tree.c.depth)
+        .join(tree, tree.c.id == Entity.id)
+        .where(tree.c.depth > 0)
+    )
+    if max_depth is not None:
+        stmt = stmt.where(tree.c.depth <= max_depth)
+    return build_page(db.execute(keyset(stmt, [Entity.id], page)).all(), [Entity.id], page)
+
+
+def get_ancestors(entity_code: str, db: Session):
+    """The chain from the direct parent up to the root."""
+    entity = get_entity_by_code(entity_code, db)
+    tree = hierarchy(entity.id, ancestors=True)
+    return db.execute(
+        select(Entity.id, Entity.type, Entity.code, Entity.label, Entity.parent_id, tree.c.depth)
+        .join(tree, tree.c.id == Entity.id)
+        .where(tree.c.depth > 0)
+        .order_by(tree.c.depth)
+    ).all()
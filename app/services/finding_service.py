@@ -1,7 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime
+import csv
+import io
+import json
 from fastapi import HTTPException
 from app.models.models import Finding, CorrectiveAction, Audit, AuditQuestion
 from app.schemas.schema import FindingUpdate
+from app.services.entity_service import entity_filter
+from app.utils.pagination import PageParams, apply_filters, build_page, keyset
 
 
 def add_finding(audit_id: int, audit_question_id: int, type: str, description: str, db: Session):
@@ -38,22 +46,33 @@ def add_finding(audit_id: int, audit_question_id: int, type: str, description: s
     }
 
 
-def get_findings_by_question(audit_question_id: int, db: Session):
-    findings = db.query(Finding).filter_by(audit_question_id=audit_question_id).all()
-    if not findings:
+def get_findings_by_question(audit_question_id: int, page: PageParams, db: Session):
+    stmt = select(Finding).where(Finding.audit_question_id == audit_question_id)
+    findings = db.execute(keyset(stmt, [Finding.id], page)).scalars().all()
+    if not findings and not page.cursor:
         raise HTTPException(status_code=404, detail=f"No findings for question ID {audit_question_id}")
-    return findings
+    return build_page(findings, [Finding.id], page)
 
 
-def get_findings_by_audit(audit_id: int, db: Session):
-    findings = db.query(Finding).filter_by(audit_id=audit_id).all()
-    if not findings:
+def get_findings_by_audit(audit_id: int, page: PageParams, db: Session):
+    stmt = select(Finding).where(Finding.audit_id == audit_id)
+    findings = db.execute(keyset(stmt, [Finding.id], page)).scalars().all()
+    if not findings and not page.cursor:
         raise HTTPException(status_code=404, detail=f"No findings for audit ID {audit_id}")
-    return findings
+    return build_page(findings, [Finding.id], page)
 
 
-def list_all_findings(db: Session):
-    return db.query(Finding).all()
+async def list_all_findings(page: PageParams, db: AsyncSession, audit_id: int = None, type: str = None,
+                            entity_id: int = None, include_descendants: bool = False):
+    # corrective_action is serialized with each finding and cannot lazy-load on an AsyncSession
+    stmt = select(Finding).options(selectinload(Finding.corrective_action))
+    stmt = apply_filters(stmt, {Finding.audit_id: audit_id, Finding.type: type})
+    if entity_id is not None:
+        stmt = stmt.join(Audit, Audit.id == Finding.audit_id).where(
+            entity_filter(Audit.entity_id, entity_id, include_descendants)
+        )
+    result = await db.execute(keyset(stmt, [Finding.id], page))
+    return build_page(result.scalars().all(), [Finding.id], page)
 
 
 def update_finding(finding_id: int, update: FindingUpdate, db: Session):
@@ -74,3 +93,63 @@ def delete_finding(finding_id: int, db: Session):
     db.delete(finding)
     db.commit()
     return {"message": f"Finding {finding_id} deleted successfully"}
+
+
+EXPORT_FIELDS = [
+    "finding_id", "audit_id", "entity_id", "audit_question_id", "type", "created_at",
+    "corrective_action_id", "corrective_action_title", "corrective_action_status",
+]
+# Rows fetched per server-side cursor round trip; each batch becomes one chunk of the response
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_query(audit_id: int = None, entity_id: int = None, status: str = None,
+                  date_from: datetime = None, date_to: datetime = None, include_descendants: bool = False):
+    stmt = (
+        select(
+            Finding.id, Finding.audit_id, Audit.entity_id, Finding.audit_question_id, Finding.type,
+            Finding.created_at, CorrectiveAction.id, CorrectiveAction.title, CorrectiveAction.status,
+        )
+        .join(Audit, Audit.id == Finding.audit_id)
+        .outerjoin(CorrectiveAction, CorrectiveAction.finding_id == Finding.id)
+    )
+    stmt = apply_filters(stmt, {
+        Finding.audit_id: audit_id,
+        CorrectiveAction.status: status,
+    })
+    if entity_id is not None:
+        stmt = stmt.where(entity_filter(Audit.entity_id, entity_id, include_descendants))
+    if date_from is not None:
+        stmt = stmt.where(Finding.created_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Finding.created_at < date_to)
+    return stmt.order_by(Finding.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):  # enums
+        return value.value
+    return value
+
+
+def export_findings(export_format: str, db: Session, **filters):
+    """Yield findings with their corrective action as NDJSON lines or CSV, one batch at a time."""
+    result = db.execute(_export_query(**filters))
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue()
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([[_export_value(v) for v in row] for row in rows])
+            yield buffer.getvalue()
+    else:
+        for rows in result.partitions():
+            yield "".join(
+                json.dumps(dict(zip(EXPORT_FIELDS, map(_export_value, row)))) + "\n"
+                for row in rows
+            )
@@ -0,0 +1,166 @@
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+from time import perf_counter
+from fastapi import HTTPException
+from sqlalchemy import select, literal_column
+from sqlalchemy.dialects.postgresql import Range, insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.models import KPIDefinition, KPIValue, PeriodType
+from app.services.kpi_service import to_naive_utc
+
+INGEST_COLUMNS = ["kpi_code", "periodtype", "period_start", "period_end", "value"]
+INGEST_BATCH_SIZE = 5000
+# Rejects beyond this many are counted but not listed in the report
+MAX_REPORTED_REJECTS = 1000
+
+_PERIOD_TYPES = {p.value for p in PeriodType}
+
+
+def _csv_batches(stream, batch_size: int):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig"))
+    missing = set(INGEST_COLUMNS) - set(reader.fieldnames or [])
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {sorted(missing)}")
+    while True:
+        rows = list(islice(reader, batch_size))
+        if not rows:
+            return
+        yield {column: [row[column] for row in rows] for column in INGEST_COLUMNS}
+
+
+def _parquet_batches(stream, batch_size: int):
+    try:
+        import pyarrow.parquet as pq  # optional dependency, only needed for Parquet files
+    except ImportError:
+        raise HTTPException(status_code=400, detail="Parquet ingest needs pyarrow installed on the server")
+    parquet = pq.ParquetFile(stream)
+    missing = set(INGEST_COLUMNS) - set(parquet.schema_arrow.names)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {sorted(missing)}")
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=INGEST_COLUMNS):
+        yield batch.to_pydict()
+
+
+def read_kpi_batches(stream, filename: str, batch_size: int = INGEST_BATCH_SIZE):
+    """Stream a CSV or Parquet file as column-oriented batches ({column: [values]})."""
+    if filename and filename.lower().endswith(".parquet"):
+        return _parquet_batches(stream, batch_size)
+    return _csv_batches(stream, batch_size)
+
+
+def _parse_timestamp(value):
+    if isinstance(value, datetime):
+        return to_naive_utc(value)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return to_naive_utc(datetime.fromisoformat(str(value).strip()))
+
+
+def _parse_value(value):
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError("value must be an integer")
+        return int(value)
+    return int(str(value).strip())
+
+
+def _parse_column(values: list, parse, name: str, errors: dict, offset: int):
+    parsed = []
+    for index, value in enumerate(values):
+        if value is None or value == "":
+            errors.setdefault(offset + index, f"{name} is missing")
+            parsed.append(None)
+            continue
+        try:
+            parsed.append(parse(value))
+        except (TypeError, ValueError):
+            errors.setdefault(offset + index, f"Invalid {name}: {value!r}")
+            parsed.append(None)
+    return parsed
+
+
+def ingest_kpi_values(batches, db: Session):
+    """Validate and upsert KPI values batch by batch, keyed on (kpi_id, periodtype, period).
+
+    Each batch is checked column by column, resolved against kpi_definition in one query and
+    written with a single multi-row INSERT ... ON CONFLICT DO UPDATE, then committed, so a
+    re-run of the same file just overwrites the same rows.
+    """
+    started = perf_counter()
+    kpi_ids = {}  # code -> id, grows as new codes show up
+    stats = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "batches": 0}
+    rejects = []
+
+    for batch in batches:
+        offset = stats["rows"]
+        size = len(batch["kpi_code"])
+        errors = {}  # row index (0-based in file) -> first error
+
+        codes = [str(code).strip() if code not in (None, "") else None for code in batch["kpi_code"]]
+        unknown = {code for code in codes if code} - set(kpi_ids)
+        if unknown:
+            kpi_ids.update(db.execute(
+                select(KPIDefinition.code, KPIDefinition.id).where(KPIDefinition.code.in_(unknown))
+            ).all())
+        for index, code in enumerate(codes):
+            if not code:
+                errors[offset + index] = "kpi_code is missing"
+            elif code not in kpi_ids:
+                errors[offset + index] = f"Unknown kpi_code: {code!r}"
+
+        periodtypes = [str(periodtype).strip() if periodtype is not None else None for periodtype in batch["periodtype"]]
+        for index, periodtype in enumerate(periodtypes):
+            if periodtype not in _PERIOD_TYPES:
+                errors.setdefault(offset + index, f"Invalid periodtype: {periodtype!r}")
+        starts = _parse_column(batch["period_start"], _parse_timestamp, "period_start", errors, offset)
+        ends = _parse_column(batch["period_end"], _parse_timestamp, "period_end", errors, offset)
+        values = _parse_column(batch["value"], _parse_value, "value", errors, offset)
+
+        # Last occurrence of a key wins; Postgres refuses to update the same row twice in one statement
+        rows = {}
+        for index in range(size):
+            row_number = offset + index
+            if row_number not in errors and ends[index] <= starts[index]:
+                errors[row_number] = "period_end must be after period_start"
+            if row_number in errors:
+                continue
+            key = (kpi_ids[codes[index]], periodtypes[index], starts[index], ends[index])
+            rows[key] = values[index]
+
+        if rows:
+            inserted = db.execute(
+                pg_insert(KPIValue)
+                .values([
+                    {"kpi_id": kpi_id, "periodtype": periodtype, "period": Range(start, end, bounds="[)"), "value": value}
+                    for (kpi_id, periodtype, start, end), value in rows.items()
+                ])
+                .on_conflict_do_update(
+                    constraint="uq_kpi_value_kpi_periodtype_period",
+                    set_={"value": literal_column("excluded.value")}
+                )
+                # xmax is 0 only for freshly inserted tuples
+                .returning(literal_column("xmax = 0"))
+            ).scalars().all()
+            db.commit()
+            stats["inserted"] += sum(1 for flag in inserted if flag)
+            stats["updated"] += sum(1 for flag in inserted if not flag)
+
+        stats["rows"] += size
+        stats["batches"] += 1
+        stats["rejected"] += len(errors)
+        for row_number in sorted(errors):
+            if len(rejects) >= MAX_REPORTED_REJECTS:
+                break
+            # Row 1 is the first data row, after the header
+            rejects.append({"row": row_number + 1, "error": errors[row_number]})
+
+    seconds = perf_counter() - started
+    return {
+        **stats,
+        "duplicates_in_file": stats["rows"] - stats["rejected"] - stats["inserted"] - stats["updated"],
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(stats["rows"] / seconds) if seconds else None,
+        "rejects": rejects,
+    }
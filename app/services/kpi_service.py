@@ -1,5 +1,16 @@
+from datetime import datetime, timezone
+from sqlalchemy import select, func, and_, or_, case, cast, literal, literal_column, Float, Numeric, text
+from sqlalchemy.dialects.postgresql import Range, insert as pg_insert
 from sqlalchemy.orm import Session
-from models import KPIDefinition, KPIValue, KPICorrectiveAction
+from app.utils.pagination import PageParams, apply_filters, build_page, keyset
+from app.models.models import KPIDefinition, KPIValue, KPICorrectiveAction, KPIEvaluationWatermark, PeriodType
+from app.services import reference_cache
+
+def to_naive_utc(value: datetime):
+    # period is a TSRANGE (no time zone); aware inputs are compared in UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 # ----------------------
 # KPI Definition Service
@@ -13,29 +24,39 @@ class KPIDefinitionService:
         self.db.add(kpi)
         self.db.commit()
         self.db.refresh(kpi)
+        reference_cache.kpi_definitions.invalidate()
         return kpi
 
     def get(self, kpi_code: str):
-        return self.db.query(KPIDefinition).filter_by(code=kpi_code).first()
+        # Served from the reference cache as a plain dict (id, code, label, type, target, thresholds)
+        return reference_cache.get_kpi_definition(kpi_code, self.db)
+
+    def lock(self, kpi_id: int):
+        """The definition row under a share lock, so it cannot be deleted before the transaction ends."""
+        return self.db.query(KPIDefinition).filter_by(id=kpi_id).with_for_update(read=True).first()
 
-    def list(self):
-        return self.db.query(KPIDefinition).all()
+    def list(self, page: PageParams, type: str = None):
+        stmt = apply_filters(select(KPIDefinition), {KPIDefinition.type: type})
+        kpis = self.db.execute(keyset(stmt, [KPIDefinition.id], page)).scalars().all()
+        return build_page(kpis, [KPIDefinition.id], page)
 
     def update(self, kpi_id: int, **kwargs):
-        kpi = self.get(kpi_id)
+        kpi = self.db.query(KPIDefinition).filter_by(id=kpi_id).first()
         if not kpi:
             return None
         for key, value in kwargs.items():
             setattr(kpi, key, value)
         self.db.commit()
+        reference_cache.kpi_definitions.invalidate()
         return kpi
 
     def delete(self, kpi_id: int):
-        kpi = self.get(kpi_id)
+        kpi = self.db.query(KPIDefinition).filter_by(id=kpi_id).first()
         if not kpi:
             return None
         self.db.delete(kpi)
         self.db.commit()
+        reference_cache.kpi_definitions.invalidate()
         return kpi
 
 # ----------------------
@@ -46,10 +67,14 @@ class KPIValueService:
         self.db = db
 
     def create(self, kpi_id: int, periodtype: str, period, value: int):
-        kpi_value = KPIValue(kpi_id=kpi_id, periodtype=periodtype, period=period, value=value)
-        self.db.add(kpi_value)
+        """Insert a value; returns None when the KPI already has one for that period."""
+        kpi_value = self.db.scalars(
+            pg_insert(KPIValue)
+            .values(kpi_id=kpi_id, periodtype=periodtype, period=period, value=value)
+            .on_conflict_do_nothing(constraint="uq_kpi_value_kpi_periodtype_period")
+            .returning(KPIValue)
+        ).first()
         self.db.commit()
-        self.db.refresh(kpi_value)
         return kpi_value
 
     def get(self, value_id: int):
@@ -58,6 +83,21 @@ class KPIValueService:
     def list_by_kpi(self, kpi_id: int):
         return self.db.query(KPIValue).filter_by(kpi_id=kpi_id).all()
 
+    def list(self, kpi_id: int, page: PageParams, start: datetime = None, end: datetime = None,
+             periodtype: PeriodType = None):
+        """Values of one KPI whose period overlaps [start, end), keyset-paginated."""
+        stmt = apply_filters(
+            select(
+                KPIValue.id, KPIValue.kpi_id, KPIValue.periodtype,
+                func.lower(KPIValue.period).label("period_start"), func.upper(KPIValue.period).label("period_end"),
+                KPIValue.value,
+            ),
+            {KPIValue.kpi_id: kpi_id, KPIValue.periodtype: periodtype}
+        )
+        if start is not None or end is not None:
+            stmt = stmt.where(KPIValue.period.overlaps(Range(to_naive_utc(start), to_naive_utc(end), bounds="[)")))
+        return build_page(self.db.execute(keyset(stmt, [KPIValue.id], page)).all(), [KPIValue.id], page)
+
     def update(self, value_id: int, **kwargs):
         kpi_value = self.get(value_id)
         if not kpi_value:
@@ -75,6 +115,90 @@ class KPIValueService:
         self.db.commit()
         return kpi_value
 
+# ----------------------
+# KPI Series Service
+# ----------------------
+SERIES_UNITS = {PeriodType.monthly: "month", PeriodType.quarterly: "quarter", PeriodType.annually: "year"}
+SERIES_UNIT_MONTHS = {PeriodType.monthly: 1, PeriodType.quarterly: 3, PeriodType.annually: 12}
+SERIES_AGGREGATES = {"avg": func.avg, "sum": func.sum, "min": func.min, "max": func.max}
+
+
+class KPISeriesService:
+    """Roll-ups of KPI values computed in one SQL statement for any number of KPIs.
+
+    Values are bucketed on the start of their period with date_trunc. Moving averages are a window
+    over the buckets of the last N periods (empty buckets are skipped, not counted as zero) and
+    year-over-year figures join each bucket to the one a year earlier.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def series(self, kpi_ids: dict, start: datetime, end: datetime, granularity: PeriodType = PeriodType.monthly,
+               aggregate: str = "avg", moving_average: int = None, yoy: bool = False,
+               periodtype: PeriodType = None):
+        """kpi_ids maps KPI id to code; returns {code: [point, ...]} ordered by bucket."""
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        unit = SERIES_UNITS[granularity]
+        window_months = SERIES_UNIT_MONTHS[granularity] * ((moving_average or 1) - 1)
+        # Reach back far enough that the first buckets in range still get their window and last year;
+        # the windows span calendar time, so gaps in the data do not stretch them
+        lookback_months = max(window_months, 12 if yoy else 0)
+        scan_start = func.date_trunc(unit, literal(start)) - func.make_interval(0, lookback_months)
+
+        bucket = func.date_trunc(unit, func.lower(KPIValue.period))
+        base = apply_filters(
+            select(
+                KPIValue.kpi_id,
+                bucket.label("bucket"),
+                cast(SERIES_AGGREGATES[aggregate](KPIValue.value), Float).label("value"),
+                func.count(KPIValue.id).label("samples"),
+            )
+            .where(KPIValue.kpi_id.in_(list(kpi_ids)))
+            .where(KPIValue.period.overlaps(func.tsrange(scan_start, end))),
+            {KPIValue.periodtype: periodtype}
+        ).group_by(KPIValue.kpi_id, bucket)
+        buckets = base.cte("buckets")
+
+        columns = [buckets.c.kpi_id, buckets.c.bucket, buckets.c.value, buckets.c.samples]
+        if moving_average:
+            # A RANGE frame over the bucket timestamps: a ROWS frame would reach past missing buckets.
+            # over() only takes integer frame offsets, hence the literal window clause.
+            columns.append(
+                cast(literal_column(
+                    f"avg({buckets.name}.value) OVER (PARTITION BY {buckets.name}.kpi_id ORDER BY {buckets.name}.bucket "
+                    f"RANGE BETWEEN interval '{int(window_months)} months' PRECEDING AND CURRENT ROW)"
+                ), Float).label("moving_average")
+            )
+        if yoy:
+            previous = buckets.alias("previous_year")
+            columns += [
+                previous.c.value.label("previous_year_value"),
+                (buckets.c.value - previous.c.value).label("yoy_delta"),
+                cast(func.round(
+                    cast((buckets.c.value - previous.c.value) * 100 / func.nullif(previous.c.value, 0), Numeric), 2
+                ), Float).label("yoy_pct"),
+            ]
+        stmt = select(*columns)
+        if yoy:
+            stmt = stmt.outerjoin(previous, and_(
+                previous.c.kpi_id == buckets.c.kpi_id,
+                previous.c.bucket == buckets.c.bucket - text("interval '1 year'"),
+            ))
+        # Windows are evaluated before this filter, so the lookback buckets only feed the figures
+        windowed = stmt.cte("windowed")
+        rows = self.db.execute(
+            select(windowed)
+            .where(windowed.c.bucket >= func.date_trunc(unit, literal(start)))
+            .order_by(windowed.c.kpi_id, windowed.c.bucket)
+        ).mappings().all()
+
+        series = {code: [] for code in kpi_ids.values()}
+        for row in rows:
+            point = dict(row)
+            series[kpi_ids[point.pop("kpi_id")]].append(point)
+        return series
+
 # ----------------------
 # KPI Corrective Action Service
 # ----------------------
@@ -111,3 +235,74 @@ class KPICorrectiveActionService:
         self.db.delete(action)
         self.db.commit()
         return action
+
+# ----------------------
+# KPI Threshold Evaluation
+# ----------------------
+THRESHOLD_WATERMARK = "thresholds"
+
+
+class KPIEvaluationService:
+    """Raises a corrective action for every KPI value outside its definition's thresholds.
+
+    A pass only reads the values whose ingest_seq is above the stored watermark and creates all
+    of their actions with one INSERT ... SELECT. Values that already have an action are skipped,
+    so running a pass again (or a full pass) never duplicates them.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    def evaluate(self, full: bool = False):
+        # Writers keep ROW EXCLUSIVE on kpi_value until they commit and SHARE waits for them, so
+        # every ingest_seq up to the max read below is visible and a late commit cannot slip
+        # under the new watermark
+        self.db.execute(text("LOCK TABLE kpi_value IN SHARE MODE"))
+        self.db.execute(
+            pg_insert(KPIEvaluationWatermark).values(name=THRESHOLD_WATERMARK).on_conflict_do_nothing()
+        )
+        watermark = self.db.execute(
+            select(KPIEvaluationWatermark).where(KPIEvaluationWatermark.name == THRESHOLD_WATERMARK).with_for_update()
+        ).scalar_one()
+        # A full pass re-checks every value, e.g. after thresholds were tightened
+        from_seq = 0 if full else watermark.last_seq
+        to_seq = self.db.execute(select(func.max(KPIValue.ingest_seq))).scalar() or 0
+
+        evaluated = created = 0
+        if to_seq > from_seq:
+            in_range = and_(KPIValue.ingest_seq > from_seq, KPIValue.ingest_seq <= to_seq)
+            evaluated = self.db.execute(select(func.count()).select_from(KPIValue).where(in_range)).scalar()
+
+            below = KPIValue.value < KPIDefinition.threshold_min
+            # Comparisons with an unset bound are NULL, which the OR treats as "not breached"
+            breaches = (
+                select(
+                    KPIValue.id,
+                    func.concat(
+                        KPIDefinition.code, " ", func.to_char(func.lower(KPIValue.period), "YYYY-MM-DD"),
+                        ": value ", KPIValue.value,
+                        case((below, " below minimum "), else_=" above maximum "),
+                        case((below, KPIDefinition.threshold_min), else_=KPIDefinition.threshold_max),
+                    ),
+                )
+                .join(KPIDefinition, KPIDefinition.id == KPIValue.kpi_id)
+                .where(
+                    in_range,
+                    or_(below, KPIValue.value > KPIDefinition.threshold_max),
+                    ~select(KPICorrectiveAction.id)
+                    .where(KPICorrectiveAction.kpi_value_id == KPIValue.id)
+                    .exists(),
+                )
+            )
+            created = len(self.db.execute(
+                pg_insert(KPICorrectiveAction)
+                .from_select(["kpi_value_id", "title"], breaches)
+                .returning(KPICorrectiveAction.id)
+            ).all())
+
+        watermark.last_seq = max(watermark.last_seq, to_seq)
+        watermark.evaluated_at = func.now()
+        self.db.commit()
+        return {
+            "from_seq": from_seq, "to_seq": to_seq,
+            "values_evaluated": evaluated, "actions_created": created,
+        }
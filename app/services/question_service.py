@@ -1,7 +1,14 @@
+from sqlalchemy import select, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from pydantic import ValidationError
+import csv
+import io
+import json
 from app.models.models import Question, QuestionnaireVersion, QuestionnaireVersionQuestion
 from app.schemas.schema import QuestionCreate, QuestionUpdate
+from app.utils.pagination import PageParams, apply_filters, build_page, keyset
 
 
 def create_question(data: QuestionCreate, questionnaire_version_id: int, db: Session):
@@ -40,8 +47,12 @@ def get_question(question_id: int, db: Session):
     return q
 
 
-def list_questions(db: Session):
-    return db.query(Question).all()
+def list_questions(page: PageParams, db: Session, response_type: str = None, criticality: str = None):
+    stmt = apply_filters(select(Question), {
+        Question.response_type: response_type,
+        Question.criticality: criticality,
+    })
+    return build_page(db.execute(keyset(stmt, [Question.id], page)).scalars().all(), [Question.id], page)
 
 
 def update_question(question_id: int, data: QuestionUpdate, db: Session):
@@ -67,8 +78,87 @@ def delete_question(question_id: int, db: Session):
     return {"message": f"Question {question_id} deleted"}
 
 
-def get_questions_by_version(version_id: int, db: Session):
+def get_questions_by_version(version_id: int, page: PageParams, db: Session):
     version = db.query(QuestionnaireVersion).filter_by(id=version_id).first()
     if not version:
         raise HTTPException(status_code=404, detail="Questionnaire version not found")
-    return version.questions
+    stmt = (
+        select(Question)
+        .join(QuestionnaireVersionQuestion, QuestionnaireVersionQuestion.question_id == Question.id)
+        .where(QuestionnaireVersionQuestion.questionnaire_version_id == version_id)
+    )
+    return build_page(db.execute(keyset(stmt, [Question.id], page)).scalars().all(), [Question.id], page)
+
+
+def read_question_file(stream, filename: str):
+    """Parse an uploaded CSV (title,response_type,criticality header) or JSON array into row dicts."""
+    if filename and filename.lower().endswith(".csv"):
+        return list(csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig")))
+    try:
+        rows = json.load(stream)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="File must be a CSV or a JSON array of questions")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="JSON import must be an array of questions")
+    return rows
+
+
+def import_questions(rows: list, questionnaire_version_id: int, db: Session):
+    """Create and link many questions to a version in one transaction.
+
+    Titles that already exist are linked instead of duplicated; the report has one entry per row.
+    """
+    qv = db.query(QuestionnaireVersion).filter_by(id=questionnaire_version_id).first()
+    if not qv:
+        raise HTTPException(status_code=404, detail="Questionnaire version not found")
+
+    report = []
+    valid = {}  # title -> QuestionCreate, first occurrence wins
+    for number, row in enumerate(rows, start=1):
+        try:
+            question = QuestionCreate.model_validate(row)
+        except ValidationError as e:
+            report.append({"row": number, "status": "invalid", "detail": e.errors(include_url=False)})
+            continue
+        if question.title in valid:
+            report.append({"row": number, "title": question.title, "status": "duplicate_in_file"})
+            continue
+        valid[question.title] = question
+        report.append({"row": number, "title": question.title, "status": None})
+
+    # One lookup for every title in the file
+    question_ids = dict(db.execute(
+        select(Question.title, Question.id).where(Question.title.in_(valid.keys()))
+    ).all())
+    existing = set(question_ids)
+
+    new_questions = [q.model_dump() for title, q in valid.items() if title not in existing]
+    if new_questions:
+        created = db.execute(
+            insert(Question).returning(Question.title, Question.id, sort_by_parameter_order=True),
+            new_questions
+        ).all()
+        question_ids.update(created)
+
+    if question_ids:
+        db.execute(
+            pg_insert(QuestionnaireVersionQuestion).on_conflict_do_nothing(),
+            [
+                {"questionnaire_version_id": questionnaire_version_id, "question_id": question_id}
+                for question_id in question_ids.values()
+            ]
+        )
+    db.commit()
+
+    for entry in report:
+        if entry["status"] is None:
+            entry["status"] = "linked_existing" if entry["title"] in existing else "created"
+        if entry.get("title") in question_ids:
+            entry["question_id"] = question_ids[entry["title"]]
+    return {
+        "questionnaire_version_id": questionnaire_version_id,
+        "created": len(new_questions),
+        "linked_existing": len(existing),
+        "rejected": sum(1 for entry in report if entry["status"] in ("invalid", "duplicate_in_file")),
+        "rows": report,
+    }
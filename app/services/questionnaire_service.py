@@ -1,7 +1,10 @@
+from sqlalchemy import select, insert, func, literal, Integer
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.models.models import Questionnaire
-from app.schemas.schema import QuestionnaireCreate, QuestionnaireUpdate
+from app.models.models import Questionnaire, QuestionnaireVersion, QuestionnaireVersionQuestion, Question
+from app.schemas.schema import QuestionnaireCreate, QuestionnaireUpdate, VersionCloneRequest
+from app.services import reference_cache
+from app.utils.pagination import PageParams, build_page, keyset
 
 
 def create_questionnaire(data: QuestionnaireCreate, db: Session):
@@ -12,14 +15,16 @@ def create_questionnaire(data: QuestionnaireCreate, db: Session):
     db.add(q)
     db.commit()
     db.refresh(q)
+    reference_cache.questionnaires.invalidate()
     return q
 
 
-def get_all_questionnaires(db: Session):
-    questionnaires = db.query(Questionnaire).all()
-    if not questionnaires:
+def get_all_questionnaires(page: PageParams, db: Session):
+    stmt = keyset(select(Questionnaire), [Questionnaire.id], page)
+    questionnaires = db.execute(stmt).scalars().all()
+    if not questionnaires and not page.cursor:
         raise HTTPException(status_code=404, detail="No questionnaires found")
-    return questionnaires
+    return build_page(questionnaires, [Questionnaire.id], page)
 
 
 def get_questionnaire(questionnaire_id: int, db: Session):
@@ -37,6 +42,7 @@ def update_questionnaire(questionnaire_id: int, data: QuestionnaireUpdate, db: S
         q.label = data.label
     db.commit()
     db.refresh(q)
+    reference_cache.questionnaires.invalidate()
     return q
 
 
@@ -46,4 +52,61 @@ def delete_questionnaire(questionnaire_id: int, db: Session):
         raise HTTPException(status_code=404, detail="Questionnaire not found")
     db.delete(q)
     db.commit()
+    reference_cache.questionnaires.invalidate()
     return {"message": "Questionnaire deleted successfully"}
+
+
+def clone_version(questionnaire_id: int, data: VersionCloneRequest, db: Session):
+    """Create version N+1 from version N (or the requested one) with its question links copied in SQL."""
+    # Locking the questionnaire serializes concurrent clones, so each reads the latest version_no
+    # only after the previous one committed; uq_questionnaire_version_questionnaire_version_no backs it up
+    q = db.query(Questionnaire).filter_by(id=questionnaire_id).with_for_update().first()
+    if not q:
+        raise HTTPException(status_code=404, detail="Questionnaire not found")
+
+    source_query = db.query(QuestionnaireVersion).filter_by(questionnaire_id=questionnaire_id)
+    if data.source_version_no is not None:
+        source = source_query.filter_by(version_no=data.source_version_no).first()
+    else:
+        source = source_query.order_by(QuestionnaireVersion.version_no.desc()).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Questionnaire version not found")
+
+    if data.add_question_ids:
+        found = set(db.execute(select(Question.id).where(Question.id.in_(data.add_question_ids))).scalars())
+        missing = sorted(set(data.add_question_ids) - found)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Questions not found: {missing}")
+
+    latest_no = db.execute(
+        select(func.max(QuestionnaireVersion.version_no)).where(QuestionnaireVersion.questionnaire_id == questionnaire_id)
+    ).scalar()
+    new_version = QuestionnaireVersion(
+        questionnaire_id=questionnaire_id,
+        version_no=(latest_no or 0) + 1,
+        status=data.status
+    )
+    db.add(new_version)
+    db.flush()
+
+    # Source links minus removals, plus additions, in a single INSERT ... SELECT (UNION drops overlaps)
+    new_id = literal(new_version.id, type_=Integer)
+    links = select(new_id, QuestionnaireVersionQuestion.question_id).where(
+        QuestionnaireVersionQuestion.questionnaire_version_id == source.id
+    )
+    if data.remove_question_ids:
+        links = links.where(QuestionnaireVersionQuestion.question_id.not_in(data.remove_question_ids))
+    if data.add_question_ids:
+        links = links.union(select(new_id, Question.id).where(Question.id.in_(data.add_question_ids)))
+    result = db.execute(
+        insert(QuestionnaireVersionQuestion).from_select(["questionnaire_version_id", "question_id"], links)
+    )
+    db.commit()
+    reference_cache.questionnaires.invalidate()
+
+    return {
+        "questionnaire_version_id": new_version.id,
+        "version_no": new_version.version_no,
+        "source_version_no": source.version_no,
+        "question_count": result.rowcount,
+    }
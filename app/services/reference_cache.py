@@ -0,0 +1,60 @@
+import os
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.models import Entity, KPIDefinition, Questionnaire, QuestionnaireVersion, Role
+from app.utils.cache import ReadThroughCache
+
+# Reference data changes a few times a week; the TTL only bounds staleness if an invalidation is missed
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", 300))
+
+entities = ReadThroughCache("entity", ttl=REFERENCE_CACHE_TTL)
+questionnaires = ReadThroughCache("questionnaire", ttl=REFERENCE_CACHE_TTL)
+roles = ReadThroughCache("role", ttl=REFERENCE_CACHE_TTL)
+kpi_definitions = ReadThroughCache("kpi_definition", ttl=REFERENCE_CACHE_TTL)
+
+CACHES = [entities, questionnaires, roles, kpi_definitions]
+
+
+def get_entity_id(code: str, db: Session):
+    return entities.get_or_load(
+        code, lambda: db.execute(select(Entity.id).where(Entity.code == code)).scalar()
+    )
+
+
+def get_latest_version(questionnaire_code: str, db: Session):
+    """{"questionnaire_id", "version_id"} for the highest version_no, version_id None when there is none."""
+    def load():
+        row = db.execute(
+            select(Questionnaire.id, QuestionnaireVersion.id)
+            .outerjoin(QuestionnaireVersion, QuestionnaireVersion.questionnaire_id == Questionnaire.id)
+            .where(Questionnaire.code == questionnaire_code)
+            .order_by(QuestionnaireVersion.version_no.desc().nulls_last())
+            .limit(1)
+        ).first()
+        if not row:
+            return None
+        return {"questionnaire_id": row[0], "version_id": row[1]}
+    return questionnaires.get_or_load(questionnaire_code, load)
+
+
+def get_role(code: str, db: Session):
+    def load():
+        role = db.query(Role).filter_by(code=code).first()
+        return {"code": role.code, "label": role.label} if role else None
+    return roles.get_or_load(code, load)
+
+
+def get_kpi_definition(code: str, db: Session):
+    def load():
+        kpi = db.query(KPIDefinition).filter_by(code=code).first()
+        if not kpi:
+            return None
+        return {
+            "id": kpi.id, "code": kpi.code, "label": kpi.label, "type": kpi.type,
+            "target": kpi.target, "threshold_min": kpi.threshold_min, "threshold_max": kpi.threshold_max,
+        }
+    return kpi_definitions.get_or_load(code, load)
+
+
+def stats():
+    return {cache.namespace: cache.stats() for cache in CACHES}
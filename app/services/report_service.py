@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.models.models import Audit, AuditQuestion, AuditResponse, Finding, CorrectiveAction
+from app.services import blob_service
+from app.utils import blob_store
+
+# Rows are pulled from a server-side cursor in batches of this size
+STREAM_BATCH_SIZE = 500
+# Only this many bytes of each response are read back for the report
+RESPONSE_PREVIEW_BYTES = 200
+
+
+def _describe_response(size, preview, digest, content_size, content_type):
+    if digest is not None:
+        return f"<{content_type or 'file'}, {content_size} bytes, sha256 {digest}>"
+    if size is None:
+        return "<empty>"
+    try:
+        text = bytes(preview).decode("utf-8")
+    except UnicodeDecodeError:
+        return f"<binary, {size} bytes>"
+    if size > RESPONSE_PREVIEW_BYTES:
+        return f"{text}... ({size} bytes)"
+    return text
+
+
+def iter_report_lines(audit: Audit, db: Session):
+    yield f"Audit ID: {audit.id}"
+    yield f"Status: {audit.status}"
+    yield f"Final Score: {audit.final_score}"
+
+    yield "Questions and Responses:"
+    responses = (
+        select(
+            AuditQuestion.id,
+            func.length(AuditResponse.value),
+            func.substring(AuditResponse.value, 1, RESPONSE_PREVIEW_BYTES),
+            AuditResponse.content_digest,
+            AuditResponse.content_size,
+            AuditResponse.content_type,
+        )
+        .join(AuditResponse, AuditResponse.audit_question_id == AuditQuestion.id)
+        .where(AuditQuestion.audit_id == audit.id)
+        .order_by(AuditQuestion.id, AuditResponse.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    for question_id, *response in db.execute(responses):
+        yield f"  - Q{question_id}: {_describe_response(*response)}"
+
+    yield "Findings and Corrective Actions:"
+    findings = (
+        select(Finding.id, Finding.type, CorrectiveAction.title, CorrectiveAction.status)
+        .outerjoin(CorrectiveAction, CorrectiveAction.finding_id == Finding.id)
+        .where(Finding.audit_id == audit.id)
+        .order_by(Finding.id, CorrectiveAction.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    # Rows arrive ordered by finding, so a finding header is emitted whenever the id changes
+    current_finding = None
+    for finding_id, finding_type, action_title, action_status in db.execute(findings):
+        if finding_id != current_finding:
+            current_finding = finding_id
+            yield f"  - Finding {finding_id} ({finding_type})"
+        if action_title is not None or action_status is not None:
+            yield f"    - Action: {action_title} [{action_status}]"
+
+    yield "Participants:"
+    for p in audit.participants:
+        yield f"  - {p.user.email} as {p.local_role}"
+
+
+def write_audit_report(audit: Audit, db: Session):
+    """Stream the audit report into the blob store line by line and return (filename, digest, size)."""
+    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    report_filename = f"report_{current_datetime}-{audit.id}.txt"
+
+    with blob_store.BlobWriter() as writer:
+        for line in iter_report_lines(audit, db):
+            writer.write(line.encode("utf-8"))
+            writer.write(b"\n")
+        digest, size = blob_service.store_content(writer, db)
+
+    return report_filename, digest, size
@@ -0,0 +1,81 @@
+import hmac
+import os
+import uuid
+from typing import Optional
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+from app.config.database import get_db
+from app.models.models import User
+from app.utils.cache import CACHE_BACKEND_URL, ReadThroughCache
+
+# Off by default so existing clients that do not send X-User-Id keep working
+ROLE_CHECKS_ENABLED = os.getenv("ROLE_CHECKS_ENABLED", "false").lower() == "true"
+ROLE_CACHE_TTL = float(os.getenv("ROLE_CACHE_TTL", 300))
+# Without a cross-process backend an assignment only invalidates this worker's cache, and the others
+# would keep honouring a revoked role until their entry expires, so enforced roles are cached briefly
+ROLE_CACHE_LOCAL_TTL = float(os.getenv("ROLE_CACHE_LOCAL_TTL", 5))
+if ROLE_CHECKS_ENABLED and (not CACHE_BACKEND_URL or CACHE_BACKEND_URL.startswith("memory://")):
+    ROLE_CACHE_TTL = min(ROLE_CACHE_TTL, ROLE_CACHE_LOCAL_TTL)
+# X-User-Id is not authenticated here: it is only trusted on requests from the authenticating
+# proxy, which proves itself with this secret in X-Proxy-Secret and strips both headers from clients
+ROLE_PROXY_SECRET = os.getenv("ROLE_PROXY_SECRET")
+if ROLE_CHECKS_ENABLED and not ROLE_PROXY_SECRET:
+    raise RuntimeError("ROLE_CHECKS_ENABLED requires ROLE_PROXY_SECRET, shared with the authenticating proxy")
+# Role required to manage reference data (entities, questionnaires, questions, KPIs), users and roles
+ADMIN_ROLE = os.getenv("ADMIN_ROLE", "admin")
+
+# One entry per user id; each user has its own version stamp so an assignment only drops that user
+user_roles = ReadThroughCache("user_roles", ttl=ROLE_CACHE_TTL, maxsize=10000, versioned_keys=True)
+
+
+def get_user_roles(user_id, db: Session):
+    """Role codes of a user, or None when the user does not exist."""
+    def load():
+        user = db.get(User, user_id)
+        if not user:
+            return None
+        return sorted(role.code for role in user.roles)
+    roles = user_roles.get_or_load(user_id, load)
+    return None if roles is None else frozenset(roles)
+
+
+def has_role(user_id, role_code: str, db: Session):
+    return role_code in (get_user_roles(user_id, db) or ())
+
+
+def invalidate_user(user_id):
+    user_roles.invalidate_key(user_id)
+
+
+def invalidate_all():
+    user_roles.invalidate()
+
+
+def require_role(role_code: str):
+    """Dependency rejecting callers whose X-User-Id does not hold role_code.
+
+    Does nothing unless ROLE_CHECKS_ENABLED is set. Requests without the proxy's X-Proxy-Secret
+    are rejected, since their X-User-Id could be anyone's. Returns the caller's user id.
+    """
+    def dependency(
+        x_user_id: Optional[str] = Header(None),
+        x_proxy_secret: Optional[str] = Header(None),
+        db: Session = Depends(get_db),
+    ):
+        if not ROLE_CHECKS_ENABLED:
+            return None
+        if not x_proxy_secret or not hmac.compare_digest(x_proxy_secret.encode(), ROLE_PROXY_SECRET.encode()):
+            raise HTTPException(status_code=401, detail="Request did not come through the authenticating proxy")
+        if not x_user_id:
+            raise HTTPException(status_code=401, detail="Missing X-User-Id header")
+        try:
+            user_id = uuid.UUID(x_user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid X-User-Id header")
+        roles = get_user_roles(user_id, db)
+        if roles is None:
+            raise HTTPException(status_code=401, detail="Unknown user")
+        if role_code not in roles:
+            raise HTTPException(status_code=403, detail=f"Role '{role_code}' required")
+        return user_id
+    return dependency
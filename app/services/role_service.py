@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.models.models import Role, UserRole, User
 from app.schemas.schema import RoleCreate, RoleUpdate, RoleAssignmentRequest
+from app.services import reference_cache, role_resolver
 
 
 def create_role(data: RoleCreate, db: Session):
@@ -12,6 +13,7 @@ def create_role(data: RoleCreate, db: Session):
     db.add(r)
     db.commit()
     db.refresh(r)
+    reference_cache.roles.invalidate()
     return r
 
 
@@ -33,6 +35,7 @@ def update_role(code: str, data: RoleUpdate, db: Session):
     r.label = data.label
     db.commit()
     db.refresh(r)
+    reference_cache.roles.invalidate()
     return r
 
 
@@ -42,6 +45,8 @@ def delete_role(code: str, db: Session):
         raise HTTPException(status_code=404, detail="Role not found")
     db.delete(r)
     db.commit()
+    reference_cache.roles.invalidate()
+    role_resolver.invalidate_all()
     return {"message": f"Role {code} deleted successfully"}
 
 
@@ -50,15 +55,16 @@ def assign_role_to_user(request: RoleAssignmentRequest, db: Session):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    role = db.query(Role).filter_by(code=request.role_code).first()
+    role = reference_cache.get_role(request.role_code, db)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
 
-    existing = db.query(UserRole).filter_by(user_id=user.id, role_code=role.code).first()
+    existing = db.query(UserRole).filter_by(user_id=user.id, role_code=role["code"]).first()
     if existing:
         raise HTTPException(status_code=400, detail="Role already assigned to user")
 
-    assignment = UserRole(user_id=user.id, role_code=role.code)
+    assignment = UserRole(user_id=user.id, role_code=role["code"])
     db.add(assignment)
     db.commit()
-    return {"message": f"Role '{role.code}' assigned to user '{user.email}'"}
+    role_resolver.invalidate_user(user.id)
+    return {"message": f"Role '{role['code']}' assigned to user '{user.email}'"}
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import Range, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.models import AuditBooking, AuditParticipant, AuditSession
+
+# next_free_slot reads bookings one window at a time instead of the whole calendar
+SCAN_WINDOW = timedelta(days=7)
+SCAN_HORIZON = timedelta(days=180)
+
+
+def as_utc(value: datetime):
+    # Naive datetimes are taken as UTC so they compare with the timestamptz values read back
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _busy_query(user_ids: list, start: datetime, end: datetime, exclude_audit_id: int = None):
+    # && on (user_id, during) is answered by the exclusion constraint's GiST index
+    stmt = select(
+        AuditBooking.user_id, AuditBooking.audit_id,
+        func.lower(AuditBooking.during).label("start_time"), func.upper(AuditBooking.during).label("end_time"),
+    ).where(
+        AuditBooking.user_id.in_(user_ids),
+        AuditBooking.during.overlaps(Range(start, end, bounds="[)")),
+    )
+    if exclude_audit_id is not None:
+        stmt = stmt.where(AuditBooking.audit_id != exclude_audit_id)
+    return stmt
+
+
+def find_conflicts(user_ids: list, start: datetime, end: datetime, db: Session, exclude_audit_id: int = None):
+    """Bookings of any of the users overlapping [start, end), one entry per audit and user."""
+    rows = db.execute(
+        _busy_query(user_ids, start, end, exclude_audit_id)
+        .order_by("start_time")
+    ).all()
+    conflicts = {}
+    for user_id, audit_id, busy_start, busy_end in rows:
+        entry = conflicts.setdefault((user_id, audit_id), {
+            "user_id": str(user_id), "audit_id": audit_id, "start_time": busy_start, "end_time": busy_end,
+        })
+        entry["end_time"] = max(entry["end_time"], busy_end)
+    return list(conflicts.values())
+
+
+def busy_intervals(user_ids: list, start: datetime, end: datetime, db: Session):
+    """{user_id: [(start, end), ...]} of the bookings overlapping [start, end), for in-memory checks."""
+    busy = defaultdict(list)
+    for user_id, _, busy_start, busy_end in db.execute(_busy_query(user_ids, start, end)):
+        busy[user_id].append((busy_start, busy_end))
+    return busy
+
+
+def overlaps(intervals: list, start: datetime, end: datetime):
+    return any(busy_start < end and start < busy_end for busy_start, busy_end in intervals)
+
+
+def next_free_slot(user_ids: list, duration: timedelta, after: datetime, db: Session,
+                   exclude_audit_id: int = None, horizon: timedelta = SCAN_HORIZON):
+    """Earliest start >= after where every user is free for duration, or None within the horizon.
+
+    Bookings are read window by window with the indexed overlap query, so only the part of the
+    calendar up to the first gap is ever fetched.
+    """
+    candidate = as_utc(after)
+    limit = candidate + horizon
+    while candidate + duration <= limit:
+        window_end = candidate + max(SCAN_WINDOW, duration)
+        busy = db.execute(
+            _busy_query(user_ids, candidate, window_end, exclude_audit_id).order_by("start_time")
+        ).all()
+        for _, _, busy_start, busy_end in busy:
+            if busy_start - candidate >= duration:
+                return candidate
+            candidate = max(candidate, busy_end)
+        # Anything starting before window_end was in this batch, so the rest of the window is free
+        if candidate + duration <= window_end:
+            return candidate if candidate + duration <= limit else None
+    return None
+
+
+def book_audits(audit_ids: List[int], db: Session):
+    """Book every participant of the audits' sessions with one INSERT ... SELECT.
+
+    A clash with another booking (e.g. a concurrent plan) trips the exclusion constraint and
+    is reported as 409.
+    """
+    db.flush()
+    rows = (
+        select(
+            AuditSession.id, AuditParticipant.user_id, AuditSession.audit_id,
+            func.tstzrange(AuditSession.start_time, AuditSession.end_time),
+        )
+        .join(AuditParticipant, AuditParticipant.audit_id == AuditSession.audit_id)
+        .where(AuditSession.audit_id.in_(audit_ids))
+        .distinct()
+    )
+    try:
+        db.execute(
+            pg_insert(AuditBooking)
+            .from_select(["audit_session_id", "user_id", "audit_id", "during"], rows)
+            # Only the primary key: an overlap must still fail on the exclusion constraint
+            .on_conflict_do_nothing(index_elements=["audit_session_id", "user_id"])
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A participant was booked for an overlapping session meanwhile")
+
+
+def release_audit(audit_id: int, db: Session):
+    db.execute(delete(AuditBooking).where(AuditBooking.audit_id == audit_id))
+
+
+def resolve_conflicts(user_ids: list, start: datetime, end: datetime, shift: bool, db: Session,
+                      exclude_audit_id: int = None):
+    """Return the (start, end) to plan: unchanged when free, moved to the next free slot when shift
+    is set, otherwise a 409 listing the conflicting bookings."""
+    conflicts = find_conflicts(user_ids, start, end, db, exclude_audit_id)
+    if not conflicts:
+        return start, end
+    duration = end - start
+    slot = next_free_slot(user_ids, duration, start, db, exclude_audit_id)
+    if shift:
+        if slot is None:
+            raise HTTPException(status_code=409, detail="No free slot found for all participants")
+        return slot, slot + duration
+    raise HTTPException(status_code=409, detail=jsonable_encoder({
+        "message": "Participants are already booked in this time range",
+        "conflicts": conflicts,
+        "next_free_slot": slot,
+    }))
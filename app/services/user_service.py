@@ -1,7 +1,11 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.models.models import User
 from app.schemas.schema import UserCreate, UserUpdate
+from app.services import role_resolver
+from app.utils.pagination import PageParams, apply_filters, build_page, keyset
 import uuid
 
 
@@ -22,8 +26,10 @@ def create_user(data: UserCreate, db: Session):
     return new_user
 
 
-def get_all_users(db: Session):
-    return db.query(User).all()
+async def get_all_users(page: PageParams, db: AsyncSession, active: bool = None):
+    stmt = apply_filters(select(User), {User.active: active})
+    result = await db.execute(keyset(stmt, [User.id], page))
+    return build_page(result.scalars().all(), [User.id], page)
 
 
 def get_user_by_email(user_email: str, db: Session):
@@ -56,4 +62,8 @@ def update_user(user_email: str, data: UserUpdate, db: Session):
 def delete_user(user_id: uuid.UUID, db: Session):
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        return {"message": f"User {user.email} deleted successfully"}
+        raise HTTPException(status_code=404, detail="User not found")
+    db.delete(user)
+    db.commit()
+    role_resolver.invalidate_user(user_id)
+    return {"message": f"User {user.email} deleted successfully"}
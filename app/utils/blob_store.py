@@ -0,0 +1,89 @@
+import hashlib
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Root folder of the content-addressed store and the read size used while ingesting
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+BLOB_CHUNK_SIZE = int(os.getenv("BLOB_CHUNK_SIZE", 1024 * 1024))
+
+
+def blob_path(digest: str):
+    # Fan out on the first two bytes of the digest to keep directories small
+    return os.path.join(BLOB_STORE_DIR, digest[:2], digest[2:4], digest)
+
+
+class BlobWriter:
+    """Write content into the store incrementally, hashing as it goes.
+
+    Data goes to a temporary file; finish() returns its digest and commit() moves it to its
+    digest path. Identical content ends up at the same path, so storing it again is a no-op.
+    Callers register the blob between the two so the row is locked against garbage collection
+    before the file is checked and placed.
+    """
+
+    def __init__(self):
+        tmp_dir = os.path.join(BLOB_STORE_DIR, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+        self._sha = hashlib.sha256()
+        self.size = 0
+        self.digest = None
+
+    def write(self, data: bytes):
+        self._sha.update(data)
+        self.size += len(data)
+        self._file.write(data)
+
+    def finish(self):
+        if self.digest is None:
+            self._file.close()
+            self.digest = self._sha.hexdigest()
+        return self.digest, self.size
+
+    def commit(self):
+        digest, size = self.finish()
+        final_path = blob_path(digest)
+        if os.path.exists(final_path):
+            os.remove(self.tmp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(self.tmp_path, final_path)
+        return digest, size
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.discard()
+
+
+def copy_stream(stream, writer: BlobWriter, chunk_size: int = BLOB_CHUNK_SIZE):
+    """Copy a file-like object into a BlobWriter chunk by chunk.
+
+    Only one chunk is held in memory at a time.
+    """
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        writer.write(chunk)
+
+
+def delete_blob(digest: str):
+    path = blob_path(digest)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def exists(digest: str):
+    return os.path.exists(blob_path(digest))
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# memory:// shares entries between caches of this process only (tests, single worker);
+# redis://host:port/db keeps every worker coherent. Unset means no shared layer.
+CACHE_BACKEND_URL = os.getenv("CACHE_BACKEND_URL")
+
+
+class InMemoryBackend:
+    """Local stand-in for the shared backend, with the same interface as RedisBackend."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, monotonic() + ttl if ttl else None)
+
+    def incr(self, key: str):
+        with self._lock:
+            value, expires_at = self._data.get(key, ("0", None))
+            value = str(int(value) + 1)
+            self._data[key] = (value, expires_at)
+            return int(value)
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed when CACHE_BACKEND_URL points at Redis
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str):
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def incr(self, key: str):
+        return self._client.incr(key)
+
+
+def backend_from_url(url: Optional[str]):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryBackend()
+    return RedisBackend(url)
+
+
+_shared_backend = None
+
+
+def shared_backend():
+    global _shared_backend
+    if _shared_backend is None:
+        _shared_backend = backend_from_url(CACHE_BACKEND_URL)
+    return _shared_backend
+
+
+class ReadThroughCache:
+    """In-process TTL/LRU cache in front of a loader, optionally backed by a shared store.
+
+    Values must be JSON-serializable. invalidate() bumps a generation counter for the whole
+    namespace; with a shared backend the counter lives there, so every worker drops its
+    local copies on the next lookup. With versioned_keys, every key also carries its own
+    version stamp so invalidate_key() can drop a single entry everywhere.
+    """
+
+    def __init__(self, namespace: str, ttl: float = 300, maxsize: int = 1024, backend=None,
+                 versioned_keys: bool = False):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.versioned_keys = versioned_keys
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, stamp, value)
+        self._local_generation = 0
+        self._local_key_versions = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else shared_backend()
+
+    def _stamp(self, key: str):
+        backend = self.backend
+        if backend is None:
+            generation = self._local_generation
+            key_version = self._local_key_versions.get(key, 0)
+        else:
+            generation = int(backend.get(f"{self.namespace}:generation") or 0)
+            key_version = int(backend.get(f"{self.namespace}:version:{key}") or 0) if self.versioned_keys else 0
+        return f"{generation}.{key_version}"
+
+    def get_or_load(self, key, loader: Callable):
+        key = str(key)
+        stamp = self._stamp(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > monotonic() and entry[1] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+        backend = self.backend
+        shared_key = f"{self.namespace}:{stamp}:{key}"
+        if backend is not None:
+            raw = backend.get(shared_key)
+            if raw is not None:
+                value = json.loads(raw)
+                self._store(key, stamp, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        # Misses are not cached, so a row created a moment later is found on the next lookup
+        if value is not None:
+            self._store(key, stamp, value)
+            if backend is not None:
+                backend.set(shared_key, json.dumps(value, default=str), self.ttl)
+        return value
+
+    def _store(self, key: str, stamp: str, value):
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl, stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._local_generation += 1
+        backend = self.backend
+        if backend is not None:
+            backend.incr(f"{self.namespace}:generation")
+
+    def invalidate_key(self, key):
+        if not self.versioned_keys:
+            return self.invalidate()
+        key = str(key)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._local_key_versions[key] = self._local_key_versions.get(key, 0) + 1
+        backend = self.backend
+        if backend is not None:
+            backend.incr(f"{self.namespace}:version:{key}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,73 @@
+import base64
+import binascii
+import json
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PageParams:
+    """Cursor and page size accepted by every paginated list endpoint."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor by the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(values: list):
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match the ordering")
+        # Convert back to the column types (UUIDs, enums...) so the comparison binds correctly
+        return [
+            None if value is None else column.type.python_type(value)
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, binascii.Error, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_filters(stmt, filters: dict):
+    """Add an equality filter for every column whose value was provided."""
+    for column, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(column == value)
+    return stmt
+
+
+def keyset(stmt, columns: list, page: PageParams):
+    """Order by the given unique key columns and seek past the cursor.
+
+    One extra row is fetched so build_page can tell whether another page exists.
+    """
+    stmt = stmt.order_by(*columns)
+    if page.cursor:
+        values = decode_cursor(page.cursor, columns)
+        if len(columns) == 1:
+            stmt = stmt.where(columns[0] > values[0])
+        else:
+            stmt = stmt.where(tuple_(*columns) > tuple_(*values))
+    return stmt.limit(page.limit + 1)
+
+
+def build_page(items, columns: list, page: PageParams):
+    items = list(items)
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return {"items": items, "next_cursor": next_cursor}